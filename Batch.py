@@ -0,0 +1,367 @@
+import argparse
+import math
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2
+
+from Detections import DetectionBatch
+from Inference import InferencePool
+from Landing import (
+    CATEGORY_STYLES, DISPLAY_HEIGHT, DISPLAY_WIDTH,
+    detect_model_batch, load_models, preprocess_frame, print_startup_report
+)
+from Pipeline import STOP, DecoderStage, WriterStage, get_until_stopped
+from Render import render_emergency, render_normal
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv')
+
+# Модели рабочего процесса, загружаются один раз в init_worker
+_worker_models = None
+
+
+def output_paths(video_path, output_dir, prefix=''):
+    name = prefix + os.path.splitext(os.path.basename(video_path))[0]
+    return (os.path.join(output_dir, f"{name}_normal_mode_output.mp4"),
+            os.path.join(output_dir, f"{name}_emergency_mode_output.mp4"))
+
+
+def read_batch(frames, batch_size, stop_event):
+    batch = []
+    while len(batch) < batch_size:
+        item = get_until_stopped(frames, stop_event)
+        if item is STOP:
+            return batch, True
+        batch.append(item)
+    return batch, False
+
+
+def list_videos(path):
+    if not os.path.isdir(path):
+        return [path]
+    return sorted(
+        os.path.join(path, name) for name in os.listdir(path)
+        if name.lower().endswith(VIDEO_EXTENSIONS)
+    )
+
+
+def open_writer(path, fps, name, codec='mp4v'):
+    fourcc = cv2.VideoWriter_fourcc(*codec)
+    return WriterStage(cv2.VideoWriter(path, fourcc, fps, (DISPLAY_WIDTH, DISPLAY_HEIGHT)), name=name)
+
+
+def process_frames(cap, models, batch_size, out_normal, out_emergency, max_frames=None, verbose=True):
+    """Обработка кадров из cap батчами: каждая модель получает batch_size кадров одним вызовом.
+
+    Возвращает (кадров, время инференса).
+    """
+    # Модели работают параллельно, каждая над целым батчем кадров
+    inference_pool = InferencePool(models, detect_model_batch)
+
+    # Декодирование идет на два батча вперед, пока модели заняты текущим
+    stop_event = threading.Event()
+    decoder = DecoderStage(cap, stop_event, maxsize=batch_size * 2, max_frames=max_frames)
+    decoder.start()
+
+    frame_count = 0
+    inference_time = 0.0
+
+    finished = False
+    while not finished:
+        batch, finished = read_batch(decoder.outbox, batch_size, stop_event)
+        if not batch:
+            break
+
+        small_frames = [preprocess_frame(frame) for _, frame in batch]
+
+        inference_start = time.perf_counter()
+        results = inference_pool.run(small_frames, budget=None)
+        inference_time += time.perf_counter() - inference_start
+
+        for i, (_, frame) in enumerate(batch):
+            detections = DetectionBatch.concat([results[key][i] for key in models if key in results])
+            display_frame = cv2.resize(frame, (DISPLAY_WIDTH, DISPLAY_HEIGHT))
+
+            out_normal.write(render_normal(display_frame, detections, CATEGORY_STYLES))
+            out_emergency.write(render_emergency(display_frame, detections, CATEGORY_STYLES))
+
+        frame_count += len(batch)
+
+    stop_event.set()
+    decoder.join(timeout=1.0)
+
+    if verbose:
+        inference_pool.print_latency_stats()
+    inference_pool.close()
+
+    return frame_count, inference_time
+
+
+def process_video(video_path, models, batch_size, output_dir='.', verbose=True):
+    """Офлайн-обработка записи полета.
+
+    Пишутся оба видео (штатный и аварийный режим), возвращается
+    (кадров, общее время, время инференса) или None, если видео не открылось.
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        print(f"Не могу открыть видео: {video_path}")
+        return None
+
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30
+    output_path_normal, output_path_emergency = output_paths(video_path, output_dir)
+    out_normal = open_writer(output_path_normal, fps, 'writer-normal')
+    out_emergency = open_writer(output_path_emergency, fps, 'writer-emergency')
+
+    start_time = time.perf_counter()
+    frame_count, inference_time = process_frames(cap, models, batch_size, out_normal, out_emergency,
+                                                 verbose=verbose)
+
+    cap.release()
+    out_normal.release()
+    out_emergency.release()
+    elapsed = time.perf_counter() - start_time
+
+    if verbose:
+        print(f"Сохранены видеофайлы:")
+        print(f"  1. Штатный режим: {output_path_normal}")
+        print(f"  2. Аварийный режим: {output_path_emergency}")
+
+    return frame_count, elapsed, inference_time
+
+
+def segment_bounds(total_frames, segments, align):
+    """Границы отрезков [start, end) примерно равной длины, кратные align кадрам.
+
+    Последний отрезок открыт (end=None) и читается до конца файла, так как
+    CAP_PROP_FRAME_COUNT бывает неточным, а при неизвестной длине (0 или -1) отрезок один.
+    """
+    if total_frames <= 0:
+        return [(0, None)]
+    length = math.ceil(total_frames / segments / align) * align
+    starts = list(range(0, total_frames, length)) or [0]
+    return [(start, start + length) for start in starts[:-1]] + [(starts[-1], None)]
+
+
+def process_segment(video_path, start, end, batch_size, segment_paths):
+    # Отрезок пишется без потерь (FFV1), чтобы итоговое видео кодировалось один раз, как при обычном прогоне
+    cap = cv2.VideoCapture(video_path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30
+    cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+
+    out_normal = open_writer(segment_paths[0], fps, 'segment-normal', codec='FFV1')
+    out_emergency = open_writer(segment_paths[1], fps, 'segment-emergency', codec='FFV1')
+
+    start_time = time.perf_counter()
+    frame_count, inference_time = process_frames(
+        cap, _worker_models, batch_size, out_normal, out_emergency,
+        max_frames=None if end is None else end - start, verbose=False)
+
+    cap.release()
+    out_normal.release()
+    out_emergency.release()
+    return frame_count, time.perf_counter() - start_time, inference_time
+
+
+def append_segment(segment_path, writer):
+    cap = cv2.VideoCapture(segment_path)
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        writer.write(frame)
+    cap.release()
+
+
+def init_worker(threads, fused=False):
+    global _worker_models
+    # Ядра делятся между процессами, иначе каждый займет все ядра своими потоками
+    cv2.setNumThreads(threads)
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    _worker_models = load_models(fused=fused)
+
+
+def process_file(video_path, batch_size, output_dir):
+    # В процесс передается только путь к файлу, кадры читаются и обрабатываются на месте
+    # и не копируются между процессами
+    return video_path, process_video(video_path, _worker_models, batch_size, output_dir, verbose=False)
+
+
+def worker_pool(workers, fused=False):
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    # spawn: рабочие процессы не наследуют потоки и состояние CUDA родителя
+    context = multiprocessing.get_context('spawn')
+    return ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                               initializer=init_worker, initargs=(threads, fused))
+
+
+def process_files(video_paths, batch_size, output_dir, workers, fused=False):
+    """Раздает файлы по пулу процессов, каждый процесс загружает модели один раз."""
+    reports = {}
+    with worker_pool(workers, fused) as executor:
+        futures = [executor.submit(process_file, path, batch_size, output_dir) for path in video_paths]
+        for future in as_completed(futures):
+            video_path, report = future.result()
+            reports[video_path] = report
+            if report is None:
+                print(f"Пропущен: {video_path}")
+            else:
+                print(f"Готово: {video_path}, {report[0]} кадров за {report[1]:.1f} с")
+
+    return [(path, reports.get(path)) for path in video_paths]
+
+
+def process_chunked(video_path, batch_size, output_dir, workers, keyframe_interval=None, verbose=True,
+                    fused=False):
+    """Одно длинное видео, разрезанное на отрезки, которые обрабатываются параллельно.
+
+    Границы отрезков кратны интервалу ключевых кадров (по умолчанию секунда видео),
+    чтобы переход к началу отрезка не декодировал лишние кадры, и размеру батча,
+    чтобы батчи совпадали с обычным прогоном. Отрезки пишутся без потерь и по готовности
+    склеиваются по порядку в итоговые файлы, которые кодируются один раз, как при обычном прогоне,
+    поэтому результат совпадает с ним кадр в кадр.
+
+    Если видео не делится на несколько отрезков (короткое или с неизвестной длиной,
+    как у некоторых контейнеров и потоков), оно обрабатывается обычным process_video.
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        print(f"Не могу открыть видео: {video_path}")
+        return None
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+
+    keyframe_interval = keyframe_interval or max(1, round(fps))
+    align = math.lcm(keyframe_interval, batch_size)
+    bounds = segment_bounds(total_frames, workers, align)
+    if len(bounds) == 1:
+        if verbose:
+            print("Видео не делится на отрезки, обычный прогон")
+        models = load_models(fused=fused)
+        if not models:
+            print("Нет доступных моделей")
+            return None
+        return process_video(video_path, models, batch_size, output_dir, verbose)
+
+    if verbose:
+        print(f"Отрезков: {len(bounds)}, кадров в отрезке: ~{bounds[0][1] or total_frames}")
+
+    output_path_normal, output_path_emergency = output_paths(video_path, output_dir)
+    out_normal = open_writer(output_path_normal, fps, 'writer-normal')
+    out_emergency = open_writer(output_path_emergency, fps, 'writer-emergency')
+
+    segment_dir = tempfile.mkdtemp(prefix='segments_', dir=output_dir)
+    segments = [
+        (os.path.join(segment_dir, f"{i:04d}_normal.mkv"), os.path.join(segment_dir, f"{i:04d}_emergency.mkv"))
+        for i in range(len(bounds))
+    ]
+
+    frame_count = 0
+    inference_time = 0.0
+    start_time = time.perf_counter()
+    try:
+        with worker_pool(len(bounds), fused) as executor:
+            futures = [
+                executor.submit(process_segment, video_path, start, end, batch_size, segment_paths)
+                for (start, end), segment_paths in zip(bounds, segments)
+            ]
+
+            # Склейка идет по порядку и начинается, как только готов очередной отрезок
+            for (start, _), segment_paths, future in zip(bounds, segments, futures):
+                segment_frames, segment_time, segment_inference = future.result()
+                frame_count += segment_frames
+                inference_time += segment_inference
+                if verbose:
+                    print(f"Отрезок с кадра {start}: {segment_frames} кадров за {segment_time:.1f} с")
+
+                append_segment(segment_paths[0], out_normal)
+                append_segment(segment_paths[1], out_emergency)
+    finally:
+        out_normal.release()
+        out_emergency.release()
+        shutil.rmtree(segment_dir, ignore_errors=True)
+
+    if verbose:
+        print(f"Сохранены видеофайлы:")
+        print(f"  1. Штатный режим: {output_path_normal}")
+        print(f"  2. Аварийный режим: {output_path_emergency}")
+
+    return frame_count, time.perf_counter() - start_time, inference_time
+
+
+def inference_rate(frame_count, inference_time):
+    rate = frame_count / inference_time if inference_time > 0 else 0.0
+    return f"{inference_time:.1f} с, {rate:.1f} кадров/с"
+
+
+def print_summary(reports, wall_time):
+    print("\nИтоги по файлам:")
+    total_frames = 0
+    total_inference = 0.0
+    for video_path, report in reports:
+        if report is None:
+            print(f"  {video_path}: не обработан")
+            continue
+        frame_count, elapsed, inference_time = report
+        total_frames += frame_count
+        total_inference += inference_time
+        print(f"  {video_path}: {frame_count} кадров, {elapsed:.1f} с, {frame_count / elapsed:.1f} кадров/с, "
+              f"инференс {inference_rate(frame_count, inference_time)}")
+
+    print(f"Всего: {total_frames} кадров за {wall_time:.1f} с, {total_frames / wall_time:.1f} кадров/с")
+    # При нескольких процессах время инференса складывается по процессам, то есть это
+    # скорость одного процесса, по ней считается число ядер для CPU-сервера
+    print(f"Инференс: {inference_rate(total_frames, total_inference)}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Офлайн-обработка записанных полетов батчами кадров")
+    parser.add_argument('video', nargs='?', default='Test5.mp4', help="видеофайл или папка с видео")
+    parser.add_argument('--batch-size', type=int, default=8)
+    parser.add_argument('--output-dir', default='.')
+    parser.add_argument('--workers', type=int, default=1,
+                        help="число процессов: для папки - по файлам, для одного видео - по отрезкам")
+    parser.add_argument('--fused', action='store_true', help="объединенная модель вместо четырех")
+    parser.add_argument('--keyframe-interval', type=int, default=None,
+                        help="интервал ключевых кадров для границ отрезков, по умолчанию секунда видео")
+    args = parser.parse_args()
+
+    video_paths = list_videos(args.video)
+    if not video_paths:
+        print(f"Нет видео в {args.video}")
+        exit()
+
+    print(f"Видео: {len(video_paths)}, размер батча: {args.batch_size}")
+    start_time = time.perf_counter()
+
+    workers = min(args.workers, len(video_paths))
+    if len(video_paths) == 1 and args.workers > 1:
+        print(f"Процессов: {args.workers}")
+        reports = [(video_paths[0], process_chunked(video_paths[0], args.batch_size, args.output_dir,
+                                                    args.workers, args.keyframe_interval, fused=args.fused))]
+    elif workers > 1:
+        print(f"Процессов: {workers}")
+        reports = process_files(video_paths, args.batch_size, args.output_dir, workers, fused=args.fused)
+    else:
+        models = load_models(fused=args.fused)
+        if not models:
+            print("Нет доступных моделей")
+            exit()
+
+        print(f"\nЗагружено моделей: {len(models)}")
+        print_startup_report(models)
+        reports = [(path, process_video(path, models, args.batch_size, args.output_dir,
+                                        verbose=len(video_paths) == 1))
+                   for path in video_paths]
+
+    print_summary(reports, time.perf_counter() - start_time)
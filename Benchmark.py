@@ -0,0 +1,341 @@
+import argparse
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+# Стили и разрешение те же, что в Landing, но без импорта ultralytics
+from Detections import (
+    CATEGORY_NAMES, CATEGORY_STYLES, DISPLAY_HEIGHT, DISPLAY_WIDTH, SAFE, CAUTION, DANGER, DetectionBatch
+)
+from Render import render_normal
+
+
+def random_detections(count, rng, width=DISPLAY_WIDTH, height=DISPLAY_HEIGHT):
+    x1 = rng.integers(0, width - 20, count)
+    y1 = rng.integers(0, height - 20, count)
+    x2 = np.minimum(x1 + rng.integers(10, 300, count), width - 1)
+    y2 = np.minimum(y1 + rng.integers(10, 200, count), height - 1)
+
+    return DetectionBatch(
+        np.stack([x1, y1, x2, y2], axis=1).astype(np.int32),
+        rng.random(count).astype(np.float32),
+        np.zeros(count, dtype=np.int32),
+        rng.integers(0, len(CATEGORY_NAMES), count).astype(np.int8),
+        np.zeros(count, dtype=np.int8)
+    )
+
+
+def render_normal_reference(frame, detections, styles):
+    # Прежняя отрисовка: копия всего кадра и addWeighted по всему кадру на каждую рамку
+    result = frame.copy()
+
+    for code in (SAFE, CAUTION, DANGER):
+        style = styles[code]
+        color = style['color']
+
+        for x1, y1, x2, y2 in detections.bboxes[detections.categories == code].tolist():
+            overlay = result.copy()
+            cv2.rectangle(overlay, (x1, y1), (x2, y2), style['fill_color'], -1)
+            cv2.addWeighted(overlay, style['fill_alpha'], result, 1 - style['fill_alpha'], 0, result)
+
+            cv2.rectangle(result, (x1, y1), (x2, y2), color, style['thickness'])
+
+            corner_size = 8
+            cv2.line(result, (x1, y1), (x1 + corner_size, y1), color, 2)
+            cv2.line(result, (x1, y1), (x1, y1 + corner_size), color, 2)
+            cv2.line(result, (x2, y1), (x2 - corner_size, y1), color, 2)
+            cv2.line(result, (x2, y1), (x2, y1 + corner_size), color, 2)
+            cv2.line(result, (x1, y2), (x1 + corner_size, y2), color, 2)
+            cv2.line(result, (x1, y2), (x1, y2 - corner_size), color, 2)
+            cv2.line(result, (x2, y2), (x2 - corner_size, y2), color, 2)
+            cv2.line(result, (x2, y2), (x2, y2 - corner_size), color, 2)
+
+    return result
+
+
+def time_per_frame(render, frame, detections, repeats):
+    render(frame, detections, CATEGORY_STYLES)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        render(frame, detections, CATEGORY_STYLES)
+    return (time.perf_counter() - start) / repeats * 1000
+
+
+def benchmark_render(box_counts, repeats, seed):
+    rng = np.random.default_rng(seed)
+    frame = rng.integers(0, 256, (DISPLAY_HEIGHT, DISPLAY_WIDTH, 3), dtype=np.uint8)
+
+    print("СРАВНЕНИЕ ОТРИСОВКИ ШТАТНОГО РЕЖИМА")
+    print("=" * 60)
+    print(f"{'Рамок':>6} {'Прежняя, мс':>14} {'Новая, мс':>12} {'Ускорение':>11} {'Совпадение':>11}")
+
+    for count in box_counts:
+        detections = random_detections(count, rng)
+
+        identical = np.array_equal(
+            render_normal_reference(frame, detections, CATEGORY_STYLES),
+            render_normal(frame, detections, CATEGORY_STYLES)
+        )
+        old_ms = time_per_frame(render_normal_reference, frame, detections, repeats)
+        new_ms = time_per_frame(render_normal, frame, detections, repeats)
+
+        print(f"{count:>6} {old_ms:>14.2f} {new_ms:>12.2f} {old_ms / new_ms:>10.1f}x {'да' if identical else 'НЕТ':>11}")
+
+
+def compare_videos(path_a, path_b):
+    # Число кадров первого видео и число несовпавших кадров (разная длина тоже считается несовпадением)
+    cap_a = cv2.VideoCapture(path_a)
+    cap_b = cv2.VideoCapture(path_b)
+    frames = 0
+    mismatches = 0
+    while True:
+        ret_a, frame_a = cap_a.read()
+        ret_b, frame_b = cap_b.read()
+        if not ret_a and not ret_b:
+            break
+        if ret_a != ret_b:
+            mismatches += 1
+            if not ret_a:
+                continue
+        elif not np.array_equal(frame_a, frame_b):
+            mismatches += 1
+        frames += ret_a
+    cap_a.release()
+    cap_b.release()
+    return frames, mismatches
+
+
+def benchmark_chunks(video_path, worker_counts, batch_size):
+    # Batch и Landing загружают ultralytics, поэтому импортируются только для этого замера
+    from Batch import output_paths, process_chunked, process_video
+    from Landing import load_models
+
+    print("ПАРАЛЛЕЛЬНАЯ ОБРАБОТКА ОДНОГО ВИДЕО ПО ОТРЕЗКАМ")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as root:
+        # Время обоих вариантов включает загрузку моделей (при отрезках - в каждом процессе)
+        serial_dir = os.path.join(root, 'serial')
+        os.makedirs(serial_dir)
+        start = time.perf_counter()
+        frame_count, _, _ = process_video(video_path, load_models(), batch_size, serial_dir, verbose=False)
+        serial_time = time.perf_counter() - start
+        reference = output_paths(video_path, serial_dir)
+
+        print(f"Видео: {video_path}, кадров: {frame_count}, размер батча: {batch_size}")
+        print(f"{'Процессов':>10} {'Время, с':>10} {'Кадров/с':>10} {'Ускорение':>11} {'Несовпадений':>13}")
+        print(f"{1:>10} {serial_time:>10.1f} {frame_count / serial_time:>10.1f} {1.0:>10.2f}x {'-':>13}")
+
+        for workers in worker_counts:
+            if workers < 2:
+                continue
+            chunked_dir = os.path.join(root, f"workers_{workers}")
+            os.makedirs(chunked_dir)
+            start = time.perf_counter()
+            process_chunked(video_path, batch_size, chunked_dir, workers, verbose=False)
+            elapsed = time.perf_counter() - start
+
+            mismatches = sum(
+                compare_videos(expected, actual)[1]
+                for expected, actual in zip(reference, output_paths(video_path, chunked_dir))
+            )
+            print(f"{workers:>10} {elapsed:>10.1f} {frame_count / elapsed:>10.1f} "
+                  f"{serial_time / elapsed:>10.2f}x {mismatches:>13}")
+
+
+def benchmark_fused(video_path, frame_count):
+    # Landing загружает ultralytics, поэтому импортируется только для этого замера
+    from Inference import InferencePool
+    from Landing import detect_model, load_models, preprocess_frame
+
+    separate = load_models()
+    fused = load_models(fused=True)
+    if not separate or not fused:
+        print("Нужны и отдельные модели, и объединенная (python Fuse.py all)")
+        return
+
+    cap = cv2.VideoCapture(video_path)
+    frames = []
+    while len(frames) < frame_count:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(preprocess_frame(frame))
+    cap.release()
+    if not frames:
+        print(f"Не могу прочитать кадры: {video_path}")
+        return
+
+    def sequential(models):
+        return lambda frame: [detect_model(key, model_data, frame) for key, model_data in models.items()]
+
+    pool = InferencePool(separate, detect_model)
+    variants = [
+        (f"{len(separate)} модели подряд", sequential(separate)),
+        (f"{len(separate)} модели в пуле", lambda frame: list(pool.run(frame, budget=None).values())),
+        ("объединенная", sequential(fused))
+    ]
+
+    print("ОБЪЕДИНЕННАЯ МОДЕЛЬ ПРОТИВ ОТДЕЛЬНЫХ")
+    print("=" * 60)
+    print(f"Видео: {video_path}, кадров: {len(frames)}")
+    print(f"{'Вариант':>18} {'мс/кадр':>10} {'Рамок/кадр':>12}")
+
+    for name, detect in variants:
+        detect(frames[0])
+        boxes = 0
+        start = time.perf_counter()
+        for frame in frames:
+            boxes += sum(len(detections) for detections in detect(frame))
+        elapsed_ms = (time.perf_counter() - start) / len(frames) * 1000
+        print(f"{name:>18} {elapsed_ms:>10.1f} {boxes / len(frames):>12.1f}")
+
+    pool.close()
+
+
+def benchmark_backends(video_path, frame_count, include_fused):
+    # Landing и Export загружают ultralytics, поэтому импортируются только для этого замера
+    from ultralytics import YOLO
+
+    from Export import (
+        BACKEND_ORDER, EXPORT_IMGSZ, backend_available, export_model, is_fresh, load_latencies, save_latencies
+    )
+    from Landing import detection_params, preprocess_frame
+    from Registry import fused_config, models_config
+
+    cap = cv2.VideoCapture(video_path)
+    frames = []
+    while len(frames) < frame_count:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(preprocess_frame(frame))
+    cap.release()
+    if not frames:
+        print(f"Не могу прочитать кадры: {video_path}")
+        return
+
+    print(f"ЗАДЕРЖКА ПО БЭКЕНДАМ, мс/кадр, imgsz={EXPORT_IMGSZ}")
+    print("=" * 60)
+    print(f"Видео: {video_path}, кадров: {len(frames)}")
+    print(f"{'Модель':>12} " + " ".join(f"{backend:>14}" for backend in BACKEND_ORDER))
+
+    configs = dict(models_config, **fused_config) if include_fused else models_config
+    for key, config in configs.items():
+        if not os.path.exists(config['path']):
+            print(f"{config['display_name']:>12} модель не найдена")
+            continue
+
+        conf_threshold, max_det = detection_params(key)
+        latencies = load_latencies(config['path'])
+        cells = []
+        for backend in BACKEND_ORDER:
+            # INT8 не экспортируется здесь, а только публикуется Quantize.py после проверки точности
+            quantized_missing = backend == 'openvino_int8' and not is_fresh(config['path'], backend)
+            if not backend_available(backend) or quantized_missing:
+                cells.append(f"{'нет':>14}")
+                continue
+            try:
+                model = YOLO(export_model(config['path'], backend), task='detect')
+                model(frames[0], imgsz=EXPORT_IMGSZ, conf=conf_threshold, verbose=False, max_det=max_det)
+
+                start = time.perf_counter()
+                for frame in frames:
+                    model(frame, imgsz=EXPORT_IMGSZ, conf=conf_threshold, verbose=False, max_det=max_det)
+                latencies[backend] = (time.perf_counter() - start) / len(frames) * 1000
+                cells.append(f"{latencies[backend]:>14.1f}")
+            except Exception as e:
+                print(f"Ошибка {key} ({backend}): {e}")
+                cells.append(f"{'ошибка':>14}")
+
+        # Замеры сохраняются рядом с весами, по ним Landing выбирает бэкенд автоматически
+        save_latencies(config['path'], latencies)
+        print(f"{config['display_name']:>12} " + " ".join(cells))
+
+
+def benchmark_tiles(video_path, frame_count):
+    # Landing загружает ultralytics, поэтому импортируется только для этого замера
+    from Landing import detect_model, detect_model_tiled, load_models, tiled_input
+    from Tiling import TILE_LEVELS, TileBudget
+
+    models = load_models()
+    tiled = {key: model_data for key, model_data in models.items() if model_data['tiler'] is not None}
+    if not tiled:
+        print("Нет моделей с tile_budget в Registry.py")
+        return
+
+    print("ПЛИТОЧНЫЙ ИНФЕРЕНС ПО СЕТКАМ")
+    print("=" * 60)
+    print(f"Видео: {video_path}, кадров: {frame_count}")
+    print(f"{'Модель':>12} {'Сетка':>10} {'мс/кадр':>10} {'Рамок/кадр':>12}")
+
+    for key, model_data in tiled.items():
+        tiler = model_data['tiler']
+
+        def detect_tiles(model_key, fixed, frames):
+            model_data['tiler'] = fixed
+            try:
+                return detect_model_tiled(model_key, model_data, frames)
+            finally:
+                model_data['tiler'] = tiler
+
+        variants = [('без плиток', lambda frames: detect_model(key, model_data, frames[0]))]
+        for cols, rows in TILE_LEVELS:
+            # Сетка из одного уровня не меняется, бюджет не важен
+            fixed = TileBudget(tiler.budget, tiler.overlap, levels=((cols, rows),))
+            variants.append((f"{cols}x{rows}", lambda frames, fixed=fixed: detect_tiles(key, fixed, frames)))
+        variants.append(('адаптивная', lambda frames: detect_model_tiled(key, model_data, frames)))
+
+        for name, detect in variants:
+            # Кадры в исходном разрешении не копятся в памяти, в замер входит только инференс
+            cap = cv2.VideoCapture(video_path)
+            elapsed = 0.0
+            boxes = 0
+            frames_done = 0
+            while frames_done < frame_count:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                frames = tiled_input(frame)
+                if frames_done == 0:
+                    detect(frames)
+                start = time.perf_counter()
+                boxes += len(detect(frames))
+                elapsed += time.perf_counter() - start
+                frames_done += 1
+            cap.release()
+            if not frames_done:
+                print(f"Не могу прочитать кадры: {video_path}")
+                return
+            print(f"{model_data['display_name']:>12} {name:>10} {elapsed / frames_done * 1000:>10.1f} "
+                  f"{boxes / frames_done:>12.1f}")
+
+        print(f"{'':>12} бюджет {tiler.budget * 1000:.0f} мс, адаптивная сетка: {tiler.grid()[0]}x{tiler.grid()[1]}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Замеры производительности системы посадки")
+    parser.add_argument('benchmark', choices=['render', 'chunks', 'fused', 'backends', 'tiles'])
+    parser.add_argument('--boxes', type=int, nargs='+', default=[10, 50, 150])
+    parser.add_argument('--repeats', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--video', default='Test5.mp4')
+    parser.add_argument('--workers', type=int, nargs='+', default=[2, 4, 8])
+    parser.add_argument('--batch-size', type=int, default=8)
+    parser.add_argument('--frames', type=int, default=100)
+    parser.add_argument('--fused', action='store_true', help="для backends: замерить и объединенную модель")
+    args = parser.parse_args()
+
+    if args.benchmark == 'render':
+        benchmark_render(args.boxes, args.repeats, args.seed)
+    elif args.benchmark == 'chunks':
+        benchmark_chunks(args.video, args.workers, args.batch_size)
+    elif args.benchmark == 'fused':
+        benchmark_fused(args.video, args.frames)
+    elif args.benchmark == 'backends':
+        benchmark_backends(args.video, args.frames, args.fused)
+    elif args.benchmark == 'tiles':
+        benchmark_tiles(args.video, args.frames)
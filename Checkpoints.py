@@ -0,0 +1,98 @@
+import pickle
+import zipfile
+
+# Единственные имена, которые при чтении метаданных восстанавливаются по-настоящему.
+# Все остальные, в том числе прочие builtins (eval, exec, getattr, __import__),
+# а также классы torch, ultralytics и numpy, заменяются заглушками без поведения
+SAFE_GLOBALS = {
+    ('collections', 'OrderedDict'),
+    ('builtins', 'object'),
+    ('builtins', 'set'),
+    ('builtins', 'frozenset'),
+    ('builtins', 'slice'),
+    ('builtins', 'complex'),
+    ('copyreg', '_reconstructor'),
+    ('_codecs', 'encode'),
+    ('datetime', 'datetime'),
+    ('datetime', 'date'),
+    ('datetime', 'timedelta'),
+    ('datetime', 'timezone'),
+}
+
+
+class _Stub:
+    """Заглушка для любого имени вне SAFE_GLOBALS: принимает любые аргументы и состояние, ничего не выполняет."""
+
+    def __new__(cls, *args, **kwargs):
+        return object.__new__(cls)
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __call__(self, *args, **kwargs):
+        return _Stub()
+
+    def __setstate__(self, state):
+        if isinstance(state, tuple) and len(state) == 2:
+            state = state[0] or state[1]
+        if isinstance(state, dict):
+            self.__dict__.update(state)
+
+
+class _MetadataUnpickler(pickle.Unpickler):
+    def find_class(self, module, name):
+        if (module, name) in SAFE_GLOBALS:
+            return super().find_class(module, name)
+        return type(str(name), (_Stub,), {})
+
+    def persistent_load(self, pid):
+        # Хранилища тензоров (веса) не читаются
+        return None
+
+
+def _names_list(names):
+    if isinstance(names, dict):
+        return [names[key] for key in sorted(names)]
+    if isinstance(names, (list, tuple)):
+        return list(names)
+    return []
+
+
+def read_checkpoint_meta(path):
+    """Метаданные чекпойнта ultralytics без torch и без сборки модели.
+
+    .pt - zip-архив torch.save, из него читается только data.pkl, веса пропускаются.
+    Возвращает словарь (names, imgsz, data, epoch, date, version) или None,
+    если файл не в формате zip или в нем нет модели.
+    """
+    if not zipfile.is_zipfile(path):
+        return None
+
+    with zipfile.ZipFile(path) as archive:
+        data_name = next((name for name in archive.namelist() if name.endswith('/data.pkl')), None)
+        if data_name is None:
+            return None
+        with archive.open(data_name) as f:
+            checkpoint = _MetadataUnpickler(f).load()
+
+    if not isinstance(checkpoint, dict):
+        return None
+
+    names = []
+    for key in ('model', 'ema'):
+        model = checkpoint.get(key)
+        names = _names_list(getattr(model, 'names', None))
+        if names:
+            break
+
+    train_args = checkpoint.get('train_args')
+    train_args = train_args if isinstance(train_args, dict) else {}
+
+    return {
+        'names': [str(name) for name in names],
+        'imgsz': train_args.get('imgsz'),
+        'data': train_args.get('data'),
+        'epoch': checkpoint.get('epoch'),
+        'date': checkpoint.get('date'),
+        'version': checkpoint.get('version')
+    }
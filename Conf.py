@@ -1,36 +1,91 @@
 # check_four_models_classes.py
-from ultralytics import YOLO
 import os
+import time
+from functools import lru_cache
+
 import yaml
 
-models_config = {
-    'model_2': {
-        'path': 'runs/landcover_yolo_model2/weights/best.pt',
-        'name': 'Model 2'
-    },
-    'model_4': {
-        'path': 'runs/landcover_yolo_model4/weights/best.pt',
-        'name': 'Model 4'
-    },
-    'model_14': {
-        'path': 'runs/landcover_yolo_model14/weights/best.pt',
-        'name': 'Model 14'
-    },
-    'model_15': {
-        'path': 'runs/landcover_yolo_model15/weights/best.pt',
-        'name': 'Model 15'
-    }
-}
+from Registry import find_model, load_index, models_config
 
 print("=" * 70)
 print("ПРОВЕРКА КЛАССОВ В МОДЕЛЯХ")
 print("=" * 70)
 
+start_time = time.perf_counter()
+index = load_index()
 
-def get_model_classes(model_path):
-    classes = []
 
+@lru_cache(maxsize=None)
+def yaml_index(root):
+    # Один обход папки на все модели: каталог -> YAML-файлы в нем
+    index = {}
+    for dirpath, dirs, files in os.walk(root):
+        yaml_files = sorted(file for file in files if file.endswith(('.yaml', '.yml')))
+        if yaml_files:
+            index[dirpath] = [os.path.join(dirpath, file) for file in yaml_files]
+    return index
+
+
+def yaml_candidates(model_dir, meta):
+    # Сначала датасет из аргументов обучения в чекпойнте, затем YAML папки запуска из индекса
+    candidates = []
+    if meta and meta.get('data') and os.path.isfile(meta['data']):
+        candidates.append(meta['data'])
+
+    for dirpath, yaml_files in yaml_index(os.path.dirname(model_dir) or '.').items():
+        if dirpath == model_dir or dirpath.startswith(model_dir + os.sep):
+            candidates.extend(yaml_files)
+    return candidates
+
+
+def read_yaml_classes(yaml_file):
+    with open(yaml_file, 'r', encoding='utf-8') as f:
+        data = yaml.safe_load(f)
+
+    if 'names' in data:
+        if isinstance(data['names'], dict):
+            return list(data['names'].values()), None
+        elif isinstance(data['names'], list):
+            return data['names'], None
+
+    # Проверяем другие возможные ключи
+    for key in ['nc', 'num_classes', 'classes']:
+        if key in data:
+            if key == 'nc' or key == 'num_classes':
+                print(f"    Найдено количество классов: {data[key]}")
+            elif key == 'classes' and isinstance(data[key], list):
+                return data[key], None
+
+    # args.yaml запуска ссылается на YAML датасета
+    if isinstance(data.get('data'), str) and os.path.isfile(data['data']):
+        return [], data['data']
+    return [], None
+
+
+def get_model_classes(model_path, meta):
+    # Классы из индекса моделей: прочитаны прямо из .pt без ultralytics и без сборки модели
+    if meta and meta['names']:
+        return meta['names'], "из индекса моделей"
+
+    model_dir = os.path.dirname(os.path.dirname(model_path))  # Поднимаемся на уровень выше weights/
+
+    # Проверяем каждый yaml файл
+    candidates = yaml_candidates(model_dir, meta)
+    for yaml_file in candidates:
+        try:
+            classes, linked = read_yaml_classes(yaml_file)
+        except Exception as yaml_error:
+            continue
+
+        if classes:
+            return classes, f"из {os.path.basename(yaml_file)}"
+        if linked and linked not in candidates:
+            candidates.append(linked)
+
+    # Крайний случай: полная загрузка модели через ultralytics
+    classes = []
     try:
+        from ultralytics import YOLO
         model = YOLO(model_path)
 
         # Пробуем разные пути к атрибутам names
@@ -40,67 +95,30 @@ def get_model_classes(model_path):
             classes = list(model.model.names.values())
         elif hasattr(model.model, 'model') and hasattr(model.model.model, 'names'):
             classes = list(model.model.model.names.values())
-
-        return classes, "из модели"
-
     except Exception as e:
-        model_dir = os.path.dirname(os.path.dirname(model_path))  # Поднимаемся на уровень выше weights/
-
-        # Ищем yaml файлы
-        yaml_files = []
-        for root, dirs, files in os.walk(model_dir):
-            for file in files:
-                if file.endswith(('.yaml', '.yml')):
-                    yaml_files.append(os.path.join(root, file))
-
-        # Проверяем каждый yaml файл
-        for yaml_file in yaml_files:
-            try:
-                with open(yaml_file, 'r', encoding='utf-8') as f:
-                    data = yaml.safe_load(f)
+        pass
 
-                    if 'names' in data:
-                        if isinstance(data['names'], dict):
-                            classes = list(data['names'].values())
-                        elif isinstance(data['names'], list):
-                            classes = data['names']
-
-                        if classes:
-                            return classes, f"из {os.path.basename(yaml_file)}"
-
-                    # Проверяем другие возможные ключи
-                    for key in ['nc', 'num_classes', 'classes']:
-                        if key in data:
-                            if key == 'nc' or key == 'num_classes':
-                                print(f"    Найдено количество классов: {data[key]}")
-                            elif key == 'classes' and isinstance(data[key], list):
-                                classes = data[key]
-                                return classes, f"из {os.path.basename(yaml_file)}"
-
-            except Exception as yaml_error:
-                continue
-
-        return classes, "не найдены"
+    if classes:
+        return classes, "из модели"
+    return classes, "не найдены"
 
 
 # Проверяем каждую модель
 for key, config in models_config.items():
     print(f"\n{'=' * 50}")
-    print(f" {config['name']} ({key})")
+    print(f" {config['display_name']} ({key})")
     print(f"{'=' * 50}")
 
-    if os.path.exists(config['path']):
+    meta = find_model(index, config['path'])
+    if meta is not None:
         print(f"  Путь: {config['path']}")
-
-        # Проверяем размер файла модели
-        try:
-            file_size = os.path.getsize(config['path']) / (1024 * 1024)  # в МБ
-            print(f"  Размер: {file_size:.1f} MB")
-        except:
-            pass
+        print(f"  Размер: {meta['size'] / (1024 * 1024):.1f} MB")
+        if meta['version'] is not None:
+            print(f"  Чекпойнт: эпоха {meta['epoch']}, imgsz {meta['imgsz']}, "
+                  f"данные {meta['data']}, ultralytics {meta['version']}, {meta['date']}")
 
         # Получаем информацию о классах
-        classes, source = get_model_classes(config['path'])
+        classes, source = get_model_classes(config['path'], meta)
 
         if classes:
             print(f"  Количество классов: {len(classes)} ({source})")
@@ -178,6 +196,8 @@ for key, config in models_config.items():
                     else:
                         print(f"       best.pt отсутствует")
 
+print(f"\nВремя проверки моделей: {(time.perf_counter() - start_time) * 1000:.0f} мс")
+
 print(f"\n{'=' * 70}")
 print("ИНСТРУКЦИЯ ПО НАСТРОЙКЕ КЛАССОВ")
 print("=" * 70)
@@ -198,8 +218,6 @@ nc: 6  # количество классов
 """)
 
 print("\nМОДЕЛИ:")
-print(f"1. Model 2: {models_config['model_2']['path']}")
-print(f"2. Model 4: {models_config['model_4']['path']}")
-print(f"3. Model 14: {models_config['model_14']['path']}")
-print(f"4. Model 15: {models_config['model_15']['path']}")
+for i, config in enumerate(models_config.values(), 1):
+    print(f"{i}. {config['display_name']}: {config['path']}")
 print("=" * 70)
@@ -0,0 +1,147 @@
+import queue
+import socket
+import sys
+import threading
+
+import cv2
+
+# Коды клавиш, которые понимает главный цикл
+KEY_NONE = 255
+KEY_ESC = 27
+KEY_SPACE = 32
+KEY_TOGGLE = 49
+
+# Текстовые команды для работы без окна (скрипт, stdin, сокет)
+COMMANDS = {
+    'esc': KEY_ESC, 'exit': KEY_ESC, 'quit': KEY_ESC,
+    'space': KEY_SPACE, 'emergency': KEY_SPACE, 'pause': KEY_SPACE,
+    '1': KEY_TOGGLE, 'highlight': KEY_TOGGLE
+}
+
+
+def parse_command(text):
+    command = text.strip().lower()
+    if command not in COMMANDS:
+        print(f"Неизвестная команда управления: {text.strip()}")
+        return KEY_NONE
+    return COMMANDS[command]
+
+
+class WindowControls:
+    """Обычный режим: кадр показывается в окне, клавиши читаются через cv2.waitKey."""
+
+    def __init__(self, window_name):
+        self.window_name = window_name
+        cv2.namedWindow(window_name, cv2.WINDOW_NORMAL)
+
+    def show(self, frame):
+        cv2.imshow(self.window_name, frame)
+
+    def poll(self, step, paused=False):
+        return cv2.waitKey(1) & 0xFF
+
+    def close(self):
+        cv2.destroyAllWindows()
+
+
+class ScriptedControls:
+    """Без окна, команды из файла сценария.
+
+    Строка файла: номер выходного кадра и команда, например "120 space".
+    Номер считается по записанным кадрам, поэтому идет и на паузе,
+    а прогон со сценарием повторяется кадр в кадр.
+    """
+
+    def __init__(self, path):
+        self.events = []
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.split('#', 1)[0].strip()
+                if not line:
+                    continue
+                step, command = line.split(maxsplit=1)
+                self.events.append((int(step), parse_command(command)))
+        self.events.sort(key=lambda event: event[0])
+        self.position = 0
+
+    def show(self, frame):
+        pass
+
+    def poll(self, step, paused=False):
+        # За один кадр выполняется одна команда, следующая - на следующем кадре
+        if self.position < len(self.events) and self.events[self.position][0] <= step:
+            key = self.events[self.position][1]
+            self.position += 1
+            return key
+        return KEY_NONE
+
+    def close(self):
+        pass
+
+
+class StreamControls:
+    """Без окна, команды построчно из stdin или TCP-сокета.
+
+    Чтение идет в отдельном потоке, главный цикл только забирает готовые команды.
+    На паузе poll ждет до frame_interval, чтобы статичный кадр писался
+    в темпе видео, а не так быстро, как успевает кодировщик.
+    """
+
+    def __init__(self, frame_interval, stream=None, port=None, host='127.0.0.1'):
+        self.frame_interval = frame_interval
+        self.commands = queue.Queue()
+        self.server = None
+
+        if port is not None:
+            self.server = socket.create_server((host, port))
+            print(f"Управление по TCP: {host}:{port}")
+            threading.Thread(target=self._accept, name='controls-server', daemon=True).start()
+        else:
+            stream = stream or sys.stdin
+            threading.Thread(target=self._read, args=(stream,), name='controls-stdin', daemon=True).start()
+
+    def _read(self, stream):
+        for line in stream:
+            if line.strip():
+                self.commands.put(parse_command(line))
+
+    def _accept(self):
+        while True:
+            try:
+                connection, _ = self.server.accept()
+            except OSError:
+                break
+            stream = connection.makefile('r', encoding='utf-8')
+            threading.Thread(target=self._read, args=(stream,), name='controls-client', daemon=True).start()
+
+    def show(self, frame):
+        pass
+
+    def poll(self, step, paused=False):
+        try:
+            if paused:
+                return self.commands.get(timeout=self.frame_interval)
+            return self.commands.get_nowait()
+        except queue.Empty:
+            return KEY_NONE
+
+    def close(self):
+        if self.server is not None:
+            self.server.close()
+
+
+def open_controls(source, window_name, fps=30):
+    """Источник управления по строке настройки.
+
+    'window' - окно OpenCV и клавиатура, 'stdin' - команды из stdin,
+    'tcp:PORT' - команды по TCP, любое другое значение - путь к файлу сценария.
+    """
+    frame_interval = 1.0 / fps if fps and fps > 0 else 1.0 / 30
+
+    if source == 'window':
+        return WindowControls(window_name)
+    if source == 'stdin':
+        return StreamControls(frame_interval)
+    if source.startswith('tcp:'):
+        return StreamControls(frame_interval, port=int(source[len('tcp:'):]))
+    return ScriptedControls(source)
@@ -0,0 +1,141 @@
+import numpy as np
+
+# Коды категорий безопасности в порядке отрисовки (SAFE -> CAUTION -> DANGER)
+CATEGORY_NAMES = ('SAFE', 'CAUTION', 'DANGER')
+CATEGORY_CODES = {name: code for code, name in enumerate(CATEGORY_NAMES)}
+SAFE = CATEGORY_CODES['SAFE']
+CAUTION = CATEGORY_CODES['CAUTION']
+DANGER = CATEGORY_CODES['DANGER']
+
+SAFETY_CATEGORIES = {
+    'SAFE': {
+        'color': (0, 255, 0),
+        'thickness': 3,
+        'fill_color': (0, 255, 0),
+        'fill_alpha': 0.4,
+        'description': 'Безопасно - можно садиться'
+    },
+    'CAUTION': {
+        'color': (0, 255, 255),
+        'thickness': 2,
+        'fill_color': (0, 255, 255),
+        'fill_alpha': 0.3,
+        'description': 'Осторожно - садиться нежелательно'
+    },
+    'DANGER': {
+        'color': (0, 0, 255),
+        'thickness': 2,
+        'fill_color': (0, 0, 255),
+        'fill_alpha': 0.25,
+        'description': 'Опасно - избегать посадки'
+    }
+}
+
+# Стили отрисовки по коду категории из DetectionBatch
+CATEGORY_STYLES = [SAFETY_CATEGORIES[name] for name in CATEGORY_NAMES]
+
+# Разрешение отображения и записи видео
+DISPLAY_WIDTH = 1280
+DISPLAY_HEIGHT = 720
+
+
+class DetectionBatch:
+    """Детекции кадра в виде набора столбцов NumPy вместо списка словарей.
+
+    Стиль отрисовки не хранится в детекциях и берется по коду категории при рисовании,
+    имя класса восстанавливается по номеру модели и номеру класса.
+    Номер трека равен -1, пока детекция не прошла через трекер.
+    """
+
+    __slots__ = ('bboxes', 'confidences', 'class_ids', 'categories', 'model_ids', 'track_ids')
+
+    def __init__(self, bboxes, confidences, class_ids, categories, model_ids, track_ids=None):
+        self.bboxes = bboxes
+        self.confidences = confidences
+        self.class_ids = class_ids
+        self.categories = categories
+        self.model_ids = model_ids
+        if track_ids is None:
+            track_ids = np.full(len(confidences), -1, dtype=np.int32)
+        self.track_ids = track_ids
+
+    @classmethod
+    def empty(cls):
+        return cls(
+            np.empty((0, 4), dtype=np.int32),
+            np.empty(0, dtype=np.float32),
+            np.empty(0, dtype=np.int32),
+            np.empty(0, dtype=np.int8),
+            np.empty(0, dtype=np.int8)
+        )
+
+    @classmethod
+    def concat(cls, batches):
+        batches = [batch for batch in batches if len(batch)]
+        if not batches:
+            return cls.empty()
+        if len(batches) == 1:
+            return batches[0]
+        return cls(*(np.concatenate([getattr(batch, name) for batch in batches]) for name in cls.__slots__))
+
+    def __len__(self):
+        return len(self.confidences)
+
+    def select(self, index):
+        return DetectionBatch(*(getattr(self, name)[index] for name in self.__slots__))
+
+    def by_category(self, code):
+        return self.select(self.categories == code)
+
+    def category_counts(self):
+        return np.bincount(self.categories, minlength=len(CATEGORY_NAMES))
+
+    def class_names(self, class_tables):
+        return [class_name_of(class_tables[model_id], class_id)
+                for model_id, class_id in zip(self.model_ids.tolist(), self.class_ids.tolist())]
+
+
+def class_name_of(classes, class_id):
+    if class_id < len(classes):
+        return classes[class_id]
+    return f"class_{class_id}"
+
+
+def resolve_category(class_name, classification, default='DANGER'):
+    # Возвращает категорию и способ, которым она найдена: точное совпадение, подстрока или по умолчанию
+    class_name_lower = class_name.lower()
+
+    if class_name_lower in classification:
+        return classification[class_name_lower], 'exact'
+
+    for key, category in classification.items():
+        if key in class_name_lower or class_name_lower in key:
+            return category, 'fuzzy'
+
+    return default, 'default'
+
+
+def build_category_table(classes, classification, num_classes=0, default='DANGER'):
+    """Таблица class_id -> код категории для одной модели, строится один раз при загрузке.
+
+    Размер таблицы покрывает и список классов из конфигурации, и все классы модели
+    (для них используется имя class_{id}); последний элемент - запасной код для
+    номеров классов за пределами таблицы. Возвращает таблицу и список классов,
+    категория которых найдена не точным совпадением.
+    """
+    size = max(len(classes), num_classes)
+    table = np.full(size + 1, CATEGORY_CODES[default], dtype=np.int8)
+    unresolved = []
+
+    for class_id in range(size):
+        class_name = class_name_of(classes, class_id)
+        category, method = resolve_category(class_name, classification, default)
+        table[class_id] = CATEGORY_CODES[category]
+        if method != 'exact':
+            unresolved.append((class_id, class_name, category, method))
+
+    return table, unresolved
+
+
+def lookup_categories(table, class_ids):
+    return table[np.minimum(class_ids, len(table) - 1)]
@@ -0,0 +1,121 @@
+import argparse
+import importlib.util
+import json
+import os
+
+from Registry import fused_config, models_config
+
+# Без замеров бэкенды выбираются в этом порядке (типичная скорость на CPU), pytorch - запасной.
+# openvino_int8 появляется только после Quantize.py, если точность прошла проверку
+BACKEND_ORDER = ('openvino_int8', 'openvino', 'onnx', 'pytorch')
+BACKEND_MODULES = {'openvino_int8': 'openvino', 'openvino': 'openvino', 'onnx': 'onnxruntime'}
+
+# Замеры задержки бэкендов лежат рядом с best.pt, их пишет Benchmark.py backends
+LATENCY_FILE = 'backends.json'
+
+EXPORT_IMGSZ = 320
+
+
+def artifact_path(weights_path, backend):
+    # Пути, по которым ultralytics сохраняет экспорт рядом с best.pt
+    stem = os.path.splitext(weights_path)[0]
+    if backend == 'onnx':
+        return stem + '.onnx'
+    if backend == 'openvino':
+        return stem + '_openvino_model'
+    if backend == 'openvino_int8':
+        return stem + '_int8_openvino_model'
+    return weights_path
+
+
+def backend_available(backend):
+    if backend == 'pytorch':
+        return True
+    return importlib.util.find_spec(BACKEND_MODULES[backend]) is not None
+
+
+def is_fresh(weights_path, backend):
+    # Экспорт действителен, пока он не старше весов
+    path = artifact_path(weights_path, backend)
+    return os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(weights_path)
+
+
+def export_model(weights_path, backend, imgsz=EXPORT_IMGSZ):
+    if backend == 'pytorch' or is_fresh(weights_path, backend):
+        return artifact_path(weights_path, backend)
+    if backend == 'openvino_int8':
+        # INT8 публикуется только через Quantize.py с проверкой точности
+        raise FileNotFoundError(f"нет проверенной INT8-модели, запустите Quantize.py для {weights_path}")
+
+    # ultralytics нужен только для самого экспорта
+    from ultralytics import YOLO
+
+    # dynamic - чтобы батчи кадров (Batch.py, MultiStream.py) шли одним вызовом
+    return YOLO(weights_path).export(format=backend, imgsz=imgsz, dynamic=True)
+
+
+def latency_path(weights_path):
+    return os.path.join(os.path.dirname(weights_path), LATENCY_FILE)
+
+
+def load_latencies(weights_path):
+    try:
+        with open(latency_path(weights_path), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_latencies(weights_path, latencies):
+    with open(latency_path(weights_path), 'w', encoding='utf-8') as f:
+        json.dump(latencies, f, indent=2)
+
+
+def select_backend(weights_path, backend='auto'):
+    """Путь к весам и бэкенд для загрузки через YOLO(...).
+
+    'auto' - самый быстрый по замерам из доступных (установлен рантайм и есть свежий экспорт),
+    без полных замеров - первый доступный по BACKEND_ORDER.
+    Явно заданный бэкенд без экспорта заменяется на pytorch.
+    """
+    if backend != 'auto':
+        if backend == 'pytorch' or (backend_available(backend) and is_fresh(weights_path, backend)):
+            return artifact_path(weights_path, backend), backend
+        print(f"Бэкенд {backend} недоступен для {weights_path}, используется pytorch")
+        return weights_path, 'pytorch'
+
+    candidates = [
+        name for name in BACKEND_ORDER
+        if name == 'pytorch' or (backend_available(name) and is_fresh(weights_path, name))
+    ]
+    # Замеры используются, только если измерены все доступные бэкенды (например, после нового экспорта - нет)
+    latencies = load_latencies(weights_path)
+    if all(name in latencies for name in candidates):
+        best = min(candidates, key=latencies.get)
+    else:
+        best = candidates[0]
+    return artifact_path(weights_path, best), best
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Экспорт моделей в CPU-рантаймы (ONNX Runtime, OpenVINO)")
+    parser.add_argument('--formats', nargs='+', choices=['onnx', 'openvino'], default=['onnx', 'openvino'])
+    parser.add_argument('--fused', action='store_true', help="экспортировать и объединенную модель")
+    parser.add_argument('--imgsz', type=int, default=EXPORT_IMGSZ)
+    args = parser.parse_args()
+
+    configs = dict(models_config, **fused_config) if args.fused else models_config
+    for key, config in configs.items():
+        if not os.path.exists(config['path']):
+            print(f"Модель не найдена: {config['path']}")
+            continue
+
+        for backend in args.formats:
+            if not backend_available(backend):
+                print(f"{config['display_name']}: {backend} не установлен ({BACKEND_MODULES[backend]})")
+                continue
+            try:
+                path = export_model(config['path'], backend, args.imgsz)
+                print(f"{config['display_name']}: {backend} -> {path}")
+            except Exception as e:
+                print(f"Ошибка экспорта {key} в {backend}: {e}")
@@ -0,0 +1,151 @@
+import argparse
+import os
+
+import cv2
+import numpy as np
+import yaml
+
+from Detections import class_name_of
+from Landing import (
+    DISPLAY_HEIGHT, DISPLAY_WIDTH, detect_model, load_models, preprocess_frame
+)
+from Registry import fused_config
+
+DATASET_DIR = 'datasets/landcover_fused'
+
+
+def union_classes(models):
+    # Объединенный список классов в порядке моделей; одинаковые имена (например, human) - один класс
+    names = []
+    for model_data in models.values():
+        for class_name in model_data['classes']:
+            if class_name not in names:
+                names.append(class_name)
+    return names
+
+
+def iter_frames(video_paths, every):
+    for video_path in video_paths:
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            print(f"Не могу открыть видео: {video_path}")
+            continue
+
+        frame_index = 0
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            if frame_index % every == 0:
+                yield os.path.splitext(os.path.basename(video_path))[0], frame_index, frame
+            frame_index += 1
+        cap.release()
+
+
+def yolo_labels(models, class_index, small_frame):
+    # Разметка кадра ответами четырех моделей (дистилляция): класс и рамка в долях кадра
+    scale = np.array([DISPLAY_WIDTH, DISPLAY_HEIGHT, DISPLAY_WIDTH, DISPLAY_HEIGHT], dtype=np.float32)
+    lines = []
+    for key, model_data in models.items():
+        detections = detect_model(key, model_data, small_frame)
+        boxes = np.clip(detections.bboxes / scale, 0.0, 1.0)
+
+        for (x1, y1, x2, y2), class_id in zip(boxes.tolist(), detections.class_ids.tolist()):
+            fused_id = class_index.get(class_name_of(model_data['classes'], class_id))
+            if fused_id is None or x2 <= x1 or y2 <= y1:
+                continue
+            lines.append(f"{fused_id} {(x1 + x2) / 2:.6f} {(y1 + y2) / 2:.6f} {x2 - x1:.6f} {y2 - y1:.6f}")
+    return lines
+
+
+def build_dataset(video_paths, dataset_dir=DATASET_DIR, every=10, val_every=5):
+    """Датасет для объединенной модели: кадры видео, размеченные четырьмя текущими моделями.
+
+    Кадры сохраняются в разрешении обработки, каждый val_every-й идет в валидацию.
+    Возвращает путь к YAML датасета для Train.py.
+    """
+    models = load_models()
+    if not models:
+        print("Нет доступных моделей")
+        return None
+
+    names = union_classes(models)
+    class_index = {name: i for i, name in enumerate(names)}
+
+    for split in ('train', 'val'):
+        os.makedirs(os.path.join(dataset_dir, 'images', split), exist_ok=True)
+        os.makedirs(os.path.join(dataset_dir, 'labels', split), exist_ok=True)
+
+    counts = {'train': 0, 'val': 0}
+    boxes = 0
+    for sample, (video_name, frame_index, frame) in enumerate(iter_frames(video_paths, every)):
+        split = 'val' if sample % val_every == val_every - 1 else 'train'
+        stem = f"{video_name}_{frame_index:06d}"
+
+        small_frame = preprocess_frame(frame)
+        lines = yolo_labels(models, class_index, small_frame)
+
+        cv2.imwrite(os.path.join(dataset_dir, 'images', split, stem + '.jpg'), small_frame)
+        with open(os.path.join(dataset_dir, 'labels', split, stem + '.txt'), 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines))
+
+        counts[split] += 1
+        boxes += len(lines)
+
+    data_path = os.path.join(dataset_dir, 'data.yaml')
+    with open(data_path, 'w', encoding='utf-8') as f:
+        yaml.safe_dump({
+            'path': os.path.abspath(dataset_dir),
+            'train': 'images/train',
+            'val': 'images/val',
+            'names': dict(enumerate(names))
+        }, f, allow_unicode=True, sort_keys=False)
+
+    print(f"Датасет: {data_path}")
+    print(f"  Кадров: обучение {counts['train']}, валидация {counts['val']}, рамок {boxes}")
+    print(f"  Классов: {len(names)} ({', '.join(names)})")
+    return data_path
+
+
+def train_fused(data_path, init='yolov8n.pt', epochs=30, imgsz=640, device=0):
+    """Обучение объединенной модели через Train.py.
+
+    init - начальные веса: yolov8n.pt (обычная детекция, как у моделей посадки)
+    или best.pt одной из моделей для дообучения. Результат сохраняется туда,
+    где его ищет fused_config, и подхватывается индексом моделей.
+    """
+    # Train.py загружает ultralytics и torch, нужен только здесь
+    from Train import train
+
+    run_dir = os.path.dirname(os.path.dirname(fused_config['fused']['path']))
+    return train(
+        model_path=init,
+        data=data_path,
+        epochs=epochs,
+        imgsz=imgsz,
+        device=device,
+        project=os.path.dirname(run_dir),
+        name=os.path.basename(run_dir),
+        exist_ok=True
+    )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Объединенная модель вместо четырех отдельных")
+    parser.add_argument('command', choices=['dataset', 'train', 'all'])
+    parser.add_argument('--videos', nargs='+', default=['Test5.mp4'])
+    parser.add_argument('--dataset-dir', default=DATASET_DIR)
+    parser.add_argument('--every', type=int, default=10, help="брать каждый N-й кадр видео")
+    parser.add_argument('--init', default='yolov8n.pt')
+    parser.add_argument('--epochs', type=int, default=30)
+    parser.add_argument('--imgsz', type=int, default=640)
+    parser.add_argument('--device', default=0)
+    args = parser.parse_args()
+
+    data_path = os.path.join(args.dataset_dir, 'data.yaml')
+    if args.command in ('dataset', 'all'):
+        data_path = build_dataset(args.videos, args.dataset_dir, args.every)
+
+    if args.command in ('train', 'all') and data_path:
+        train_fused(data_path, args.init, args.epochs, args.imgsz, args.device)
+        print(f"Объединенная модель: {fused_config['fused']['path']}")
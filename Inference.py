@@ -0,0 +1,292 @@
+import math
+import queue
+import threading
+import time
+
+import cv2
+
+
+class InferencePool:
+    """Постоянный пул инференса: по одному рабочему потоку на каждую загруженную модель.
+
+    Потоки создаются один раз при старте и получают кадры через ограниченные очереди,
+    поэтому на каждом кадре не создаются новые threading.Thread.
+
+    На каждый кадр дается общий бюджет времени на все модели. Результаты, пришедшие
+    после срока своего кадра, отбрасываются по номеру кадра, а задания, срок которых
+    истек еще в очереди, не запускаются вовсе.
+    """
+
+    def __init__(self, models, detect_fn, queue_size=1):
+        self.models = models
+        self.detect_fn = detect_fn
+        self.frame_id = 0
+        self.lock = threading.Lock()
+        self.run_lock = threading.Lock()
+        self.tasks = {}
+        self.results = {}
+        self.threads = {}
+        self.stats = {}
+
+        for key, model_data in models.items():
+            self.tasks[key] = queue.Queue(maxsize=queue_size)
+            self.results[key] = queue.Queue(maxsize=queue_size)
+            self.stats[key] = {
+                'calls': 0, 'total': 0.0, 'last': 0.0, 'max': 0.0,
+                'timeouts': 0, 'late': 0, 'cancelled': 0
+            }
+
+            thread = threading.Thread(
+                target=self._worker,
+                args=(key, model_data),
+                name=f"inference-{key}",
+                daemon=True
+            )
+            self.threads[key] = thread
+            thread.start()
+
+    def _worker(self, key, model_data):
+        tasks = self.tasks[key]
+        results = self.results[key]
+
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+
+            frame_id, frame, deadline = task
+            start = time.perf_counter()
+
+            # Срок кадра истек, пока задание ждало в очереди: результат уже никому не нужен
+            if start >= deadline:
+                with self.lock:
+                    self.stats[key]['cancelled'] += 1
+                continue
+
+            try:
+                detections = self.detect_fn(key, model_data, frame)
+            except Exception as e:
+                print(f"Ошибка инференса {key}: {e}")
+                detections = None
+            elapsed = time.perf_counter() - start
+
+            with self.lock:
+                stats = self.stats[key]
+                stats['calls'] += 1
+                stats['total'] += elapsed
+                stats['last'] = elapsed
+                stats['max'] = max(stats['max'], elapsed)
+
+            _put_latest(results, (frame_id, detections))
+
+    def submit(self, frame, deadline, keys=None):
+        self.frame_id += 1
+        for key in self.tasks if keys is None else keys:
+            _put_latest(self.tasks[key], (self.frame_id, frame, deadline))
+        return self.frame_id
+
+    def collect(self, frame_id, deadline, keys=None):
+        collected = {}
+        for key in self.results if keys is None else keys:
+            results = self.results[key]
+            while True:
+                remaining = None if deadline == math.inf else max(deadline - time.perf_counter(), 0)
+                try:
+                    result_id, detections = results.get(timeout=remaining)
+                except queue.Empty:
+                    with self.lock:
+                        self.stats[key]['timeouts'] += 1
+                    break
+
+                if result_id == frame_id:
+                    # None - модель упала на этом кадре, результата нет
+                    if detections is not None:
+                        collected[key] = detections
+                    break
+
+                # Опоздавший результат предыдущего кадра отбрасывается
+                with self.lock:
+                    self.stats[key]['late'] += 1
+        return collected
+
+    def run(self, frame, budget=0.8, keys=None):
+        # Общий срок на все модели кадра: худшее ожидание равно budget, а не budget * число моделей,
+        # budget=None - ждать без срока (офлайн-обработка).
+        # Пул может вызываться из нескольких потоков (стадия инференса и пауза)
+        with self.run_lock:
+            deadline = math.inf if budget is None else time.perf_counter() + budget
+            frame_id = self.submit(frame, deadline, keys)
+            return self.collect(frame_id, deadline, keys)
+
+    def latency_stats(self):
+        report = {}
+        with self.lock:
+            for key, stats in self.stats.items():
+                calls = stats['calls']
+                report[key] = {
+                    'calls': calls,
+                    'mean_ms': stats['total'] / calls * 1000 if calls else 0.0,
+                    'last_ms': stats['last'] * 1000,
+                    'max_ms': stats['max'] * 1000,
+                    'timeouts': stats['timeouts'],
+                    'late': stats['late'],
+                    'cancelled': stats['cancelled']
+                }
+        return report
+
+    def print_latency_stats(self):
+        print("\nЗадержка инференса по моделям:")
+        for key, stats in self.latency_stats().items():
+            name = self.models[key].get('display_name', key)
+            print(f"  {name} ({key}): вызовов {stats['calls']}, "
+                  f"среднее {stats['mean_ms']:.1f} мс, "
+                  f"последнее {stats['last_ms']:.1f} мс, "
+                  f"макс {stats['max_ms']:.1f} мс")
+            print(f"    не успели к сроку: {stats['timeouts']}, "
+                  f"отброшено опоздавших: {stats['late']}, "
+                  f"отменено в очереди: {stats['cancelled']}")
+
+    def close(self):
+        for tasks in self.tasks.values():
+            _put_latest(tasks, None)
+        for thread in self.threads.values():
+            thread.join(timeout=1.0)
+
+
+class AdaptiveStride:
+    """Выбор кадров для инференса вместо фиксированного frame_count % 3.
+
+    Нижняя граница шага - сколько кадров видео проходит за время одного инференса,
+    верхняя - max_stride. Внутри этих границ шаг зависит от изменения сцены
+    относительно последнего обработанного кадра (средняя разница уменьшенных
+    серых кадров): на статичном зависании инференс редкий, при быстром снижении - каждый кадр.
+    """
+
+    def __init__(self, fps, min_stride=1, max_stride=15, low_change=2.0, high_change=12.0, thumb_size=(64, 36)):
+        self.fps = fps if fps and fps > 0 else 30
+        self.min_stride = min_stride
+        self.max_stride = max_stride
+        self.low_change = low_change
+        self.high_change = high_change
+        self.thumb_size = thumb_size
+
+        self.latency = 0.0
+        self.reference = None
+        self.frames_since = 0
+        self.stride = min_stride
+        self.last_change = 0.0
+
+        self.inferred = 0
+        self.skipped = 0
+        self.stride_total = 0
+
+    def scene_change(self, frame):
+        thumb = cv2.resize(frame, self.thumb_size, interpolation=cv2.INTER_AREA)
+        thumb = cv2.cvtColor(thumb, cv2.COLOR_BGR2GRAY)
+        if self.reference is None:
+            return thumb, math.inf
+        return thumb, float(cv2.absdiff(thumb, self.reference).mean())
+
+    def next_stride(self, change):
+        latency_stride = max(self.min_stride, math.ceil(self.latency * self.fps))
+        max_stride = max(self.max_stride, latency_stride)
+
+        if change >= self.high_change:
+            return latency_stride
+        if change <= self.low_change:
+            return max_stride
+
+        ratio = (self.high_change - change) / (self.high_change - self.low_change)
+        return latency_stride + round(ratio * (max_stride - latency_stride))
+
+    def should_infer(self, frame):
+        thumb, change = self.scene_change(frame)
+        self.last_change = change
+        self.frames_since += 1
+        self.stride = self.next_stride(change)
+
+        if self.reference is None or self.frames_since >= self.stride:
+            self.reference = thumb
+            self.inferred += 1
+            self.stride_total += self.frames_since
+            self.frames_since = 0
+            return True
+
+        self.skipped += 1
+        return False
+
+    def update_latency(self, seconds):
+        # Сглаженная задержка инференса всех моделей на одном кадре
+        self.latency = seconds if self.inferred <= 1 else 0.8 * self.latency + 0.2 * seconds
+
+    def print_stats(self):
+        mean_stride = self.stride_total / self.inferred if self.inferred else 0.0
+        print("\nАдаптивный шаг инференса:")
+        print(f"  Кадров с инференсом: {self.inferred}")
+        print(f"  Пропущено кадров: {self.skipped}")
+        print(f"  Текущий шаг: {self.stride}, средний шаг: {mean_stride:.1f}")
+        print(f"  Задержка инференса: {self.latency * 1000:.1f} мс при {self.fps} FPS")
+
+
+class ModelSchedule:
+    """Отдельная частота инференса для каждой модели.
+
+    У модели может быть задана частота 'rate_hz' (по времени видео) или шаг 'stride'
+    (в кадрах с инференсом, по умолчанию каждый). Для моделей, чья очередь не пришла,
+    используется последний полученный результат.
+    """
+
+    def __init__(self, models):
+        self.models = models
+        self.tick = 0
+        self.next_time = {key: 0.0 for key in models}
+        self.last_tick = {key: 0 for key in models}
+        self.latest = {key: None for key in models}
+        self.runs = {key: 0 for key in models}
+        self.fresh = []
+
+    def due(self, timestamp):
+        self.tick += 1
+        keys = []
+        for key, model_data in self.models.items():
+            rate_hz = model_data.get('rate_hz')
+            if self.latest[key] is None:
+                keys.append(key)
+            elif rate_hz:
+                if timestamp >= self.next_time[key]:
+                    keys.append(key)
+            elif self.tick - self.last_tick[key] >= model_data.get('stride', 1):
+                keys.append(key)
+        return keys
+
+    def update(self, timestamp, results):
+        self.fresh = list(results)
+        for key, detections in results.items():
+            rate_hz = self.models[key].get('rate_hz')
+            self.latest[key] = detections
+            self.last_tick[key] = self.tick
+            self.next_time[key] = timestamp + 1.0 / rate_hz if rate_hz else timestamp
+            self.runs[key] += 1
+
+    def latest_results(self):
+        return [self.latest[key] for key in self.models if self.latest[key] is not None]
+
+    def print_stats(self):
+        print("\nРасписание моделей:")
+        for key, model_data in self.models.items():
+            rate_hz = model_data.get('rate_hz')
+            rate = f"{rate_hz} Гц" if rate_hz else f"каждый {model_data.get('stride', 1)}-й кадр инференса"
+            print(f"  {model_data.get('display_name', key)} ({key}): {rate}, запусков {self.runs[key]}")
+
+
+def _put_latest(target_queue, item):
+    # Ограниченная очередь: если воркер не успевает, старое задание заменяется новым
+    while True:
+        try:
+            target_queue.put_nowait(item)
+            return
+        except queue.Full:
+            try:
+                target_queue.get_nowait()
+            except queue.Empty:
+                pass
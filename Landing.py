@@ -0,0 +1,284 @@
+import time
+
+# Отсчет запуска системы: от него считаются импорт, загрузка и время до первого кадра
+STARTUP_START = time.perf_counter()
+
+from ultralytics import YOLO
+import cv2
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+IMPORT_TIME = time.perf_counter() - STARTUP_START
+
+from Detections import (
+    CATEGORY_STYLES, DISPLAY_HEIGHT, DISPLAY_WIDTH, DetectionBatch, build_category_table, lookup_categories
+)
+from Export import select_backend
+from Registry import find_model, fused_config, load_index, models_config
+from Tiling import TileBudget, cross_tile_nms
+
+SAFETY_CLASSIFICATION = {
+    'building': 'DANGER',
+    'ar-marker': 'CAUTION',
+    'bald-tree': 'DANGER',
+    'bicycle': 'DANGER',
+    'car': 'DANGER',
+    'dirt': 'SAFE',
+    'dog': 'DANGER',
+    'door': 'DANGER',
+    'fence': 'DANGER',
+    'fence-pole': 'DANGER',
+    'grass': 'SAFE',
+    'gravel': 'CAUTION',
+    'human': 'DANGER',
+    'log': 'DANGER',
+    'metal': 'DANGER',
+    'misc': 'CAUTION',
+    'mobile-home': 'DANGER',
+    'other': 'CAUTION',
+    'pickup-truck': 'DANGER',
+    'pole': 'DANGER',
+    'rocks': 'DANGER',
+    'sand': 'SAFE',
+    'tree': 'DANGER',
+    'wood': 'DANGER',
+    'small-vehicle': 'DANGER',
+    'large-vehicle': 'DANGER',
+    'buildings': 'DANGER',
+    'road': 'CAUTION',
+    'vegetation': 'SAFE',
+    'waterbody': 'DANGER',
+}
+
+PROCESS_WIDTH = 640
+PROCESS_HEIGHT = 360
+
+# Масштаб координат рамок из разрешения обработки в разрешение отображения (x1, y1, x2, y2)
+BOX_SCALE = np.array([DISPLAY_WIDTH / PROCESS_WIDTH, DISPLAY_HEIGHT / PROCESS_HEIGHT,
+                      DISPLAY_WIDTH / PROCESS_WIDTH, DISPLAY_HEIGHT / PROCESS_HEIGHT])
+
+
+def load_model(key, config, entry, backend='auto'):
+    if entry is None:
+        print(f"Модель не найдена: {config['path']}")
+        return None
+
+    start = time.perf_counter()
+    weights_path, backend = select_backend(config['path'], backend)
+    try:
+        model = YOLO(weights_path, task='detect')
+    except Exception as e:
+        if backend == 'pytorch':
+            print(f"Ошибка загрузки {key}: {e}")
+            return None
+
+        # Экспорт не загрузился - запасной вариант через PyTorch
+        print(f"Ошибка загрузки {key} ({backend}): {e}, используется pytorch")
+        backend = 'pytorch'
+        try:
+            model = YOLO(config['path'])
+        except Exception as e:
+            print(f"Ошибка загрузки {key}: {e}")
+            return None
+
+    # Классы берутся из индекса (из самих весов), без индекса - из загруженной модели
+    classes = entry['names']
+    if not classes:
+        model_names = getattr(model, 'names', None) or {}
+        classes = [model_names[class_id] for class_id in sorted(model_names)]
+
+    print(f"{config['display_name']}: {len(classes)} классов")
+    return {
+        'model': model,
+        'display_name': config['display_name'],
+        'classes': classes,
+        'rate_hz': config.get('rate_hz'),
+        'stride': config.get('stride', 1),
+        # Сетка плиток подбирается отдельно для каждой модели по ее собственной задержке
+        'tiler': TileBudget(config['tile_budget']) if config.get('tile_budget') else None,
+        'backend': backend,
+        'load_time': time.perf_counter() - start
+    }
+
+
+def warm_up_model(model_key, model_data):
+    # Первый вызов модели платит за ленивую инициализацию (веса на устройство, подбор ядер),
+    # поэтому он делается на пустом кадре до начала обработки видео
+    dummy_frame = np.zeros((PROCESS_HEIGHT, PROCESS_WIDTH, 3), dtype=np.uint8)
+    start = time.perf_counter()
+    try:
+        detect_model(model_key, model_data, dummy_frame)
+    except Exception as e:
+        print(f"Ошибка прогрева {model_key}: {e}")
+    model_data['warmup_time'] = time.perf_counter() - start
+
+
+def load_models(warm_up=True, fused=False, backend='auto'):
+    # Модели загружаются и прогреваются параллельно, порядок в models как в models_config.
+    # fused=True - вместо отдельных моделей одна объединенная (Fuse.py),
+    # backend - 'auto' (самый быстрый из экспортированных, см. Export.py),
+    # 'openvino_int8' (Quantize.py), 'openvino', 'onnx' или 'pytorch'
+    config_set = fused_config if fused else models_config
+    index = load_index()
+    entries = [find_model(index, config['path']) for config in config_set.values()]
+    backends = [backend] * len(config_set)
+    with ThreadPoolExecutor(max_workers=max(1, len(config_set))) as executor:
+        loaded = list(executor.map(load_model, config_set, config_set.values(), entries, backends))
+    models = {key: model_data for key, model_data in zip(config_set, loaded) if model_data is not None}
+
+    # Таблицы class_id -> код категории строятся один раз для каждой модели,
+    # классы без точного совпадения в SAFETY_CLASSIFICATION выводятся при запуске
+    for model_id, model_data in enumerate(models.values()):
+        model_names = getattr(model_data['model'], 'names', None) or {}
+        category_table, unresolved = build_category_table(
+            model_data['classes'], SAFETY_CLASSIFICATION, num_classes=len(model_names))
+
+        model_data['model_id'] = model_id
+        model_data['category_table'] = category_table
+
+        for class_id, class_name, category, method in unresolved:
+            method_name = 'по подстроке' if method == 'fuzzy' else 'по умолчанию'
+            print(f"  {model_data['display_name']}: класс {class_id} '{class_name}' -> {category} ({method_name})")
+
+    if warm_up and models:
+        with ThreadPoolExecutor(max_workers=len(models)) as executor:
+            list(executor.map(warm_up_model, models, models.values()))
+
+    return models
+
+
+def print_startup_report(models):
+    print("\nЗапуск:")
+    print(f"  Импорт ultralytics: {IMPORT_TIME:.2f} с")
+    for key, model_data in models.items():
+        warmup_time = model_data.get('warmup_time')
+        warmup = f"{warmup_time:.2f} с" if warmup_time is not None else "нет"
+        print(f"  {model_data['display_name']} ({key}, {model_data['backend']}): "
+              f"загрузка {model_data['load_time']:.2f} с, прогрев {warmup}")
+    print(f"  Готово через {time.perf_counter() - STARTUP_START:.2f} с после запуска")
+
+
+def preprocess_frame(frame):
+    # Кадр для моделей уменьшается один раз прямо из декодированного кадра
+    # и передается всем моделям как общий буфер только для чтения
+    small_frame = cv2.resize(frame, (PROCESS_WIDTH, PROCESS_HEIGHT))
+    small_frame.flags.writeable = False
+    return small_frame
+
+
+def detection_params(model_key):
+    conf_threshold = 0.5
+    max_det = 40
+
+    if model_key == 'model_4':
+        conf_threshold = 0.3
+        max_det = 60
+
+    # Объединенная модель обучена на разметке, уже отфильтрованной порогами отдельных моделей,
+    # поэтому порог - наименьший из них, а лимит рамок - их сумма
+    if model_key == 'fused':
+        conf_threshold = 0.3
+        max_det = 180
+
+    return conf_threshold, max_det
+
+
+def extract_detections(result, model_data, scale=BOX_SCALE, offset=None):
+    # offset - начало плитки (x, y, x, y) в кадре, по которому считается scale
+    if result.boxes is None or len(result.boxes) == 0:
+        return DetectionBatch.empty()
+
+    # Все рамки переносятся с устройства одним вызовом
+    boxes = result.boxes.cpu().numpy()
+    xyxy = boxes.xyxy.astype(np.int32)
+    if offset is not None:
+        xyxy = xyxy + np.asarray(offset, dtype=np.int32)
+    bboxes = (xyxy * scale).astype(np.int32)
+    confs = boxes.conf.astype(np.float32)
+    if boxes.cls is not None:
+        cls_ids = boxes.cls.astype(np.int32)
+    else:
+        cls_ids = np.zeros(len(confs), dtype=np.int32)
+
+    categories = lookup_categories(model_data['category_table'], cls_ids)
+    model_ids = np.full(len(confs), model_data['model_id'], dtype=np.int8)
+
+    return DetectionBatch(bboxes, confs, cls_ids, categories, model_ids)
+
+
+def detect_model(model_key, model_data, small_frame):
+    conf_threshold, max_det = detection_params(model_key)
+
+    results = model_data['model'](
+        small_frame,
+        imgsz=320,
+        conf=conf_threshold,
+        verbose=False,
+        max_det=max_det
+    )
+
+    return DetectionBatch.concat([extract_detections(r, model_data) for r in results])
+
+
+def detect_model_batch(model_key, model_data, small_frames):
+    # Несколько кадров уходят в модель одним батчем, результат - DetectionBatch на каждый кадр
+    conf_threshold, max_det = detection_params(model_key)
+
+    results = model_data['model'](
+        list(small_frames),
+        imgsz=320,
+        conf=conf_threshold,
+        verbose=False,
+        max_det=max_det
+    )
+
+    return [extract_detections(r, model_data) for r in results]
+
+
+def tiled_input(frame):
+    # В плиточном режиме моделям нужен и общий уменьшенный кадр, и кадр в исходном разрешении
+    return preprocess_frame(frame), frame
+
+
+def detect_model_tiled(model_key, model_data, frames):
+    """Инференс по плиткам кадра в исходном разрешении.
+
+    frames - пара из tiled_input. Модели без tile_budget в конфиге работают
+    как detect_model на уменьшенном кадре. Для остальных кадр режется на перекрывающиеся
+    плитки по сетке TileBudget, все плитки уходят в модель одним батчем, рамки переводятся
+    в координаты отображения и объединяются NMS по плиткам.
+    """
+    small_frame, frame = frames
+    tiler = model_data.get('tiler')
+    if tiler is None:
+        return detect_model(model_key, model_data, small_frame)
+
+    conf_threshold, max_det = detection_params(model_key)
+    height, width = frame.shape[:2]
+    tiles = tiler.tiles(width, height)
+
+    start = time.perf_counter()
+    results = model_data['model'](
+        [frame[y1:y2, x1:x2] for x1, y1, x2, y2 in tiles],
+        imgsz=320,
+        conf=conf_threshold,
+        verbose=False,
+        max_det=max_det
+    )
+
+    scale = np.array([DISPLAY_WIDTH / width, DISPLAY_HEIGHT / height, DISPLAY_WIDTH / width, DISPLAY_HEIGHT / height])
+    detections = DetectionBatch.concat([
+        extract_detections(r, model_data, scale, (x1, y1, x1, y1)) for r, (x1, y1, _, _) in zip(results, tiles)
+    ])
+    if len(tiles) > 1:
+        detections = detections.select(cross_tile_nms(detections)[:max_det])
+
+    tiler.update(time.perf_counter() - start)
+    return detections
+
+
+def print_tiling_stats(models):
+    print("\nПлиточный инференс:")
+    for model_data in models.values():
+        if model_data.get('tiler') is not None:
+            model_data['tiler'].print_stats(model_data['display_name'])
@@ -0,0 +1,225 @@
+import argparse
+import collections
+import os
+import queue
+import threading
+import time
+
+import cv2
+
+from Batch import output_paths
+from Detections import DetectionBatch
+from Inference import InferencePool
+from Landing import (
+    CATEGORY_STYLES, DISPLAY_HEIGHT, DISPLAY_WIDTH,
+    detect_model_batch, load_models, preprocess_frame, print_startup_report
+)
+from Pipeline import STOP, DecoderStage, WriterStage
+from Render import render_emergency, render_normal
+
+
+class VideoStream:
+    """Один входной поток: свой декодер, свои два выходных файла и своя статистика."""
+
+    def __init__(self, video_path, output_dir, stop_event, prefix=''):
+        self.video_path = video_path
+        self.cap = cv2.VideoCapture(video_path)
+        self.opened = self.cap.isOpened()
+        self.done = not self.opened
+        if not self.opened:
+            return
+
+        fps = self.cap.get(cv2.CAP_PROP_FPS) or 30
+        self.output_path_normal, self.output_path_emergency = output_paths(video_path, output_dir, prefix)
+
+        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+        self.out_normal = WriterStage(
+            cv2.VideoWriter(self.output_path_normal, fourcc, fps, (DISPLAY_WIDTH, DISPLAY_HEIGHT)))
+        self.out_emergency = WriterStage(
+            cv2.VideoWriter(self.output_path_emergency, fourcc, fps, (DISPLAY_WIDTH, DISPLAY_HEIGHT)))
+
+        self.decoder = DecoderStage(self.cap, stop_event)
+
+        self.frames = 0
+        self.window_frames = None
+        self.window_end = None
+        self.start_time = None
+        self.end_time = None
+        self.last_served = None
+        self.max_gap = 0.0
+
+    def start(self):
+        self.start_time = time.perf_counter()
+        self.last_served = self.start_time
+        self.decoder.start()
+
+    def next_frame(self, timeout):
+        # Поток, у которого кадр еще не декодирован, пропускает раунд и не задерживает остальных
+        try:
+            item = self.decoder.outbox.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        if item is STOP:
+            self.finish()
+            return None
+        return item
+
+    def write(self, frame, detections):
+        display_frame = cv2.resize(frame, (DISPLAY_WIDTH, DISPLAY_HEIGHT))
+        self.out_normal.write(render_normal(display_frame, detections, CATEGORY_STYLES))
+        self.out_emergency.write(render_emergency(display_frame, detections, CATEGORY_STYLES))
+
+        now = time.perf_counter()
+        self.max_gap = max(self.max_gap, now - self.last_served)
+        self.last_served = now
+        self.frames += 1
+
+    def finish(self):
+        # Время потока заканчивается на последнем обработанном кадре
+        self.done = True
+        self.end_time = self.last_served
+
+    def close(self):
+        if not self.opened:
+            return
+        if self.end_time is None:
+            self.finish()
+        self.decoder.join(timeout=1.0)
+        self.cap.release()
+        self.out_normal.release()
+        self.out_emergency.release()
+
+    def fps(self):
+        elapsed = (self.end_time or time.perf_counter()) - self.start_time
+        return self.frames / elapsed if elapsed > 0 else 0.0
+
+    def close_window(self, window_end):
+        # Конец окна, в котором активны все потоки: дальше оставшиеся потоки идут без конкурентов
+        self.window_frames = self.frames
+        self.window_end = window_end
+
+    def window_fps(self):
+        elapsed = self.window_end - self.start_time
+        return self.window_frames / elapsed if elapsed > 0 else 0.0
+
+
+def output_prefixes(video_paths):
+    # Записи разных дронов часто называются одинаково (drone1/DJI_0001.MP4, drone2/DJI_0001.MP4),
+    # такие потоки получают номер в начале имени, иначе их выходные видео перезаписали бы друг друга
+    names = [os.path.normcase(os.path.splitext(os.path.basename(path))[0]) for path in video_paths]
+    counts = collections.Counter(names)
+    return [f"{i}_" if counts[name] > 1 else '' for i, name in enumerate(names, 1)]
+
+
+def jain_fairness(values):
+    # Индекс Джайна: 1.0 - все потоки получают одинаково, 1/N - все досталось одному
+    total = sum(values)
+    squares = sum(value * value for value in values)
+    return total * total / (len(values) * squares) if squares else 1.0
+
+
+def process_streams(video_paths, models, output_dir='.', frame_timeout=0.01):
+    """Несколько видео на одном наборе моделей.
+
+    Каждый раунд берет не больше одного кадра из каждого потока (по кругу), кадры всех
+    потоков идут в модели одним батчем, результаты раздаются обратно по потокам.
+    Так ни один поток не может занять весь инференс и оставить остальные без кадров.
+    """
+    stop_event = threading.Event()
+    streams = []
+    for video_path, prefix in zip(video_paths, output_prefixes(video_paths)):
+        stream = VideoStream(video_path, output_dir, stop_event, prefix)
+        if not stream.opened:
+            print(f"Не могу открыть видео: {video_path}")
+            continue
+        streams.append(stream)
+
+    if not streams:
+        return []
+
+    inference_pool = InferencePool(models, detect_model_batch)
+    for stream in streams:
+        stream.start()
+
+    rounds = 0
+    window_open = True
+    try:
+        while not all(stream.done for stream in streams):
+            if window_open and any(stream.done for stream in streams):
+                window_open = False
+                window_end = time.perf_counter()
+                for stream in streams:
+                    stream.close_window(window_end)
+
+            batch = []
+            for stream in streams:
+                if stream.done:
+                    continue
+                item = stream.next_frame(frame_timeout)
+                if item is not None:
+                    batch.append((stream, item[1]))
+
+            if not batch:
+                continue
+
+            rounds += 1
+            results = inference_pool.run([preprocess_frame(frame) for _, frame in batch], budget=None)
+
+            for i, (stream, frame) in enumerate(batch):
+                detections = DetectionBatch.concat([results[key][i] for key in models if key in results])
+                stream.write(frame, detections)
+    except KeyboardInterrupt:
+        print("\nОстановка по Ctrl+C")
+    finally:
+        stop_event.set()
+        if window_open:
+            window_end = time.perf_counter()
+            for stream in streams:
+                stream.close_window(window_end)
+        for stream in streams:
+            stream.close()
+
+    inference_pool.print_latency_stats()
+    inference_pool.close()
+    print(f"\nРаундов инференса: {rounds}")
+
+    return streams
+
+
+def print_stream_stats(streams):
+    print("\nПотоки:")
+    for i, stream in enumerate(streams, 1):
+        print(f"  {i}. {stream.video_path}: кадров {stream.frames}, {stream.fps():.1f} кадров/с, "
+              f"{stream.window_fps():.1f} кадров/с, пока активны все потоки, "
+              f"макс. ожидание кадра {stream.max_gap * 1000:.0f} мс")
+        print(f"     Штатный режим: {stream.output_path_normal}")
+        print(f"     Аварийный режим: {stream.output_path_emergency}")
+
+    fps_values = [stream.fps() for stream in streams]
+    print(f"Суммарно: {sum(stream.frames for stream in streams)} кадров, {sum(fps_values):.1f} кадров/с")
+    # Общий FPS потоков разной длины отличается и при честном чередовании (длинный поток в конце
+    # идет один), поэтому справедливость считается по пропускной способности, пока активны все потоки
+    fairness = jain_fairness([stream.window_fps() for stream in streams])
+    print(f"Справедливость (индекс Джайна, пока активны все потоки): {fairness:.3f}")
+    print(f"Макс. ожидание кадра по всем потокам: {max(stream.max_gap for stream in streams) * 1000:.0f} мс")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Одновременная обработка нескольких видео с дронов")
+    parser.add_argument('videos', nargs='+')
+    parser.add_argument('--output-dir', default='.')
+    parser.add_argument('--fused', action='store_true', help="объединенная модель вместо четырех")
+    args = parser.parse_args()
+
+    models = load_models(fused=args.fused)
+    if not models:
+        print("Нет доступных моделей")
+        exit()
+
+    print(f"\nЗагружено моделей: {len(models)}")
+    print_startup_report(models)
+    print(f"Потоков: {len(args.videos)}")
+
+    streams = process_streams(args.videos, models, args.output_dir)
+    if streams:
+        print_stream_stats(streams)
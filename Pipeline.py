@@ -0,0 +1,108 @@
+import queue
+import threading
+
+# Маркер конца потока кадров, проходит через все стадии по порядку
+STOP = object()
+
+
+def put_until_stopped(target_queue, item, stop_event):
+    while not stop_event.is_set():
+        try:
+            target_queue.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def get_until_stopped(source_queue, stop_event):
+    while not stop_event.is_set():
+        try:
+            return source_queue.get(timeout=0.1)
+        except queue.Empty:
+            continue
+    return STOP
+
+
+class DecoderStage(threading.Thread):
+    """Поток чтения кадров из cv2.VideoCapture, выдает (номер кадра, кадр) по порядку.
+
+    max_frames ограничивает число кадров (чтение отрезка видео), None - до конца файла.
+    """
+
+    def __init__(self, cap, stop_event, maxsize=4, max_frames=None):
+        super().__init__(name='decoder', daemon=True)
+        self.cap = cap
+        self.stop_event = stop_event
+        self.max_frames = max_frames
+        self.outbox = queue.Queue(maxsize=maxsize)
+
+    def run(self):
+        frame_index = 0
+        try:
+            while not self.stop_event.is_set():
+                if self.max_frames is not None and frame_index >= self.max_frames:
+                    break
+                ret, frame = self.cap.read()
+                if not ret:
+                    break
+
+                frame_index += 1
+                if not put_until_stopped(self.outbox, (frame_index, frame), self.stop_event):
+                    return
+        finally:
+            put_until_stopped(self.outbox, STOP, self.stop_event)
+
+
+class Stage(threading.Thread):
+    """Стадия конвейера: один поток, поэтому порядок кадров сохраняется."""
+
+    def __init__(self, name, process, inbox, stop_event, maxsize=4):
+        super().__init__(name=name, daemon=True)
+        self.process = process
+        self.inbox = inbox
+        self.stop_event = stop_event
+        self.outbox = queue.Queue(maxsize=maxsize)
+
+    def run(self):
+        try:
+            while True:
+                item = get_until_stopped(self.inbox, self.stop_event)
+                if item is STOP:
+                    break
+                if not put_until_stopped(self.outbox, self.process(item), self.stop_event):
+                    return
+        except Exception as e:
+            print(f"Ошибка в стадии {self.name}: {e}")
+            self.stop_event.set()
+        finally:
+            put_until_stopped(self.outbox, STOP, self.stop_event)
+
+
+class WriterStage(threading.Thread):
+    """Отдельный поток кодирования для одного выходного файла.
+
+    Повторяет интерфейс cv2.VideoWriter (write/release); release дописывает
+    все кадры из очереди и только потом закрывает файл.
+    """
+
+    def __init__(self, writer, name='writer', maxsize=8):
+        super().__init__(name=name, daemon=True)
+        self.writer = writer
+        self.inbox = queue.Queue(maxsize=maxsize)
+        self.start()
+
+    def write(self, frame):
+        self.inbox.put(frame)
+
+    def run(self):
+        while True:
+            frame = self.inbox.get()
+            if frame is STOP:
+                break
+            self.writer.write(frame)
+        self.writer.release()
+
+    def release(self):
+        self.inbox.put(STOP)
+        self.join()
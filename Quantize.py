@@ -0,0 +1,105 @@
+import argparse
+import datetime
+import json
+import os
+import shutil
+import tempfile
+
+from ultralytics import YOLO
+
+from Export import EXPORT_IMGSZ, artifact_path
+from Registry import find_model, fused_config, load_index, models_config
+from Train import TRAIN_PARAMS
+
+QUANT_BACKEND = 'openvino_int8'
+REPORT_FILE = 'quantization.json'
+
+
+def evaluate(model_path, data, imgsz):
+    # mAP50-95 и mAP50 на валидационной части датасета
+    metrics = YOLO(model_path, task='detect').val(
+        data=data, imgsz=imgsz, batch=1, split='val', plots=False, verbose=False)
+    return float(metrics.box.map), float(metrics.box.map50)
+
+
+def quantize_model(weights_path, data, imgsz=EXPORT_IMGSZ, fraction=0.25, max_drop=0.01):
+    """INT8-квантизация через OpenVINO с калибровкой на fraction валидационных изображений.
+
+    Модель публикуется (кладется рядом с best.pt, где ее находит Export.select_backend),
+    только если mAP50-95 упал относительно FP32 не больше чем на max_drop.
+    Итог проверки пишется в quantization.json рядом с весами.
+    """
+    # Экспорт идет из копии best.pt во временной папке: ultralytics пишет INT8-модель
+    # рядом с весами, и без копии он перезаписал бы опубликованную модель до проверки точности
+    scratch = tempfile.mkdtemp(prefix='quantize_', dir=os.path.dirname(weights_path))
+    try:
+        scratch_weights = os.path.join(scratch, os.path.basename(weights_path))
+        shutil.copy2(weights_path, scratch_weights)
+        candidate = str(YOLO(scratch_weights).export(
+            format='openvino', int8=True, data=data, fraction=fraction, imgsz=imgsz, dynamic=True))
+
+        fp32_map, fp32_map50 = evaluate(weights_path, data, imgsz)
+        int8_map, int8_map50 = evaluate(candidate, data, imgsz)
+        drop = fp32_map - int8_map
+        published = drop <= max_drop
+
+        if published:
+            # Прежняя модель убирается в scratch и удаляется вместе с ним
+            target = artifact_path(weights_path, QUANT_BACKEND)
+            if os.path.exists(target):
+                shutil.move(target, os.path.join(scratch, 'previous'))
+            shutil.move(candidate, target)
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    report = {
+        'weights': weights_path,
+        'data': data,
+        'imgsz': imgsz,
+        'calibration_fraction': fraction,
+        'fp32_map': fp32_map,
+        'fp32_map50': fp32_map50,
+        'int8_map': int8_map,
+        'int8_map50': int8_map50,
+        'map_drop': drop,
+        'max_drop': max_drop,
+        'published': published,
+        'date': datetime.datetime.now().isoformat(timespec='seconds')
+    }
+    with open(os.path.join(os.path.dirname(weights_path), REPORT_FILE), 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="INT8-квантизация моделей посадки с проверкой точности")
+    parser.add_argument('--data', default=None,
+                        help="YAML датасета; по умолчанию - датасет обучения из чекпойнта или Train.py")
+    parser.add_argument('--fraction', type=float, default=0.25, help="доля валидации для калибровки")
+    parser.add_argument('--max-drop', type=float, default=0.01, help="допустимое падение mAP50-95")
+    parser.add_argument('--imgsz', type=int, default=EXPORT_IMGSZ)
+    parser.add_argument('--fused', action='store_true', help="квантизовать и объединенную модель")
+    args = parser.parse_args()
+
+    index = load_index()
+    configs = dict(models_config, **fused_config) if args.fused else models_config
+    reports = {}
+    for key, config in configs.items():
+        entry = find_model(index, config['path'])
+        if entry is None:
+            print(f"Модель не найдена: {config['path']}")
+            continue
+
+        data = args.data or entry.get('data') or TRAIN_PARAMS['data']
+        print(f"\n{config['display_name']} ({key}): калибровка и проверка на {data}")
+        try:
+            reports[key] = quantize_model(config['path'], data, args.imgsz, args.fraction, args.max_drop)
+        except Exception as e:
+            print(f"Ошибка квантизации {key}: {e}")
+
+    print(f"\nINT8 против FP32 (mAP50-95), допустимое падение {args.max_drop:.3f}:")
+    for key, report in reports.items():
+        status = "опубликована" if report['published'] else "ОТКЛОНЕНА"
+        print(f"  {configs[key]['display_name']} ({key}): FP32 {report['fp32_map']:.3f}, "
+              f"INT8 {report['int8_map']:.3f}, падение {report['map_drop']:.3f} - {status}")
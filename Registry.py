@@ -0,0 +1,113 @@
+import glob
+import json
+import os
+import tempfile
+
+from Checkpoints import read_checkpoint_meta
+
+RUNS_DIR = 'runs'
+INDEX_NAME = 'models_index.json'
+
+# Модели системы посадки. Списки классов не задаются вручную,
+# а берутся из индекса, то есть из самих весов.
+# tile_budget - бюджет в секундах на вызов модели в плиточном режиме (Tiling.py)
+models_config = {
+    'model_2': {
+        'path': 'runs/landcover_yolo_model2/weights/best.pt',
+        'display_name': 'Building',
+        'rate_hz': 2
+    },
+    'model_4': {
+        'path': 'runs/landcover_yolo_model4/weights/best.pt',
+        'display_name': 'Objects',
+        'rate_hz': 5,
+        'tile_budget': 0.15
+    },
+    'model_14': {
+        'path': 'runs/landcover_yolo_model14/weights/best.pt',
+        'display_name': 'Vehicles',
+        'stride': 1
+    },
+    'model_15': {
+        'path': 'runs/landcover_yolo_model15/weights/best.pt',
+        'display_name': 'Landcover',
+        'rate_hz': 1
+    }
+}
+
+# Одна модель с объединенным списком классов всех моделей выше (собирается Fuse.py)
+fused_config = {
+    'fused': {
+        'path': 'runs/landcover_yolo_fused/weights/best.pt',
+        'display_name': 'Fused',
+        'stride': 1
+    }
+}
+
+
+def scan_runs(runs_dir=RUNS_DIR):
+    return sorted(os.path.normpath(path) for path in glob.glob(os.path.join(runs_dir, '*', 'weights', 'best.pt')))
+
+
+def read_entry(path, stat):
+    try:
+        meta = read_checkpoint_meta(path) or {}
+    except Exception as e:
+        print(f"Не удалось прочитать метаданные {path}: {e}")
+        meta = {}
+
+    return {
+        'path': path,
+        'mtime': stat.st_mtime,
+        'size': stat.st_size,
+        'names': meta.get('names', []),
+        'imgsz': meta.get('imgsz'),
+        'data': meta.get('data'),
+        'epoch': meta.get('epoch'),
+        'date': meta.get('date'),
+        'version': meta.get('version')
+    }
+
+
+def load_index(runs_dir=RUNS_DIR):
+    """Индекс всех runs/*/weights/best.pt: путь -> (mtime, size, классы, imgsz, ...).
+
+    Индекс хранится в runs/models_index.json. Заново читаются только веса,
+    у которых изменились размер или время изменения, файл индекса
+    перезаписывается, только если что-то поменялось.
+    """
+    index_path = os.path.join(runs_dir, INDEX_NAME)
+    try:
+        with open(index_path, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        cached = {}
+
+    index = {}
+    for path in scan_runs(runs_dir):
+        stat = os.stat(path)
+        entry = cached.get(path)
+        if entry is None or entry.get('size') != stat.st_size or entry.get('mtime') != stat.st_mtime:
+            entry = read_entry(path, stat)
+        index[path] = entry
+
+    if index != cached and os.path.isdir(runs_dir):
+        # Индекс одновременно читают и пишут процессы Batch.py --workers, поэтому он пишется
+        # во временный файл и подменяется целиком: читатель видит либо старый, либо новый индекс
+        try:
+            fd, tmp_path = tempfile.mkstemp(prefix=INDEX_NAME + '.', suffix='.tmp', dir=runs_dir)
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(index, f, ensure_ascii=False, indent=2)
+                os.replace(tmp_path, index_path)
+            except BaseException:
+                os.remove(tmp_path)
+                raise
+        except OSError as e:
+            print(f"Не удалось сохранить индекс моделей: {e}")
+
+    return index
+
+
+def find_model(index, path):
+    return index.get(os.path.normpath(path))
@@ -0,0 +1,117 @@
+
+import cv2
+import numpy as np
+
+from Detections import SAFE, CAUTION, DANGER
+
+# Кадры-заливки одного цвета под размер кадра, из них берутся области рамок
+_fill_canvases = {}
+
+
+def fill_canvas(shape, color):
+    key = (shape, color)
+    canvas = _fill_canvases.get(key)
+    if canvas is None:
+        canvas = np.empty(shape, dtype=np.uint8)
+        canvas[:] = color
+        canvas.flags.writeable = False
+        _fill_canvases[key] = canvas
+    return canvas
+
+
+def clip_box(x1, y1, x2, y2, width, height):
+    # Та же область, что закрашивает cv2.rectangle(..., -1): границы включительно, с обрезкой по кадру
+    left, right = min(x1, x2), max(x1, x2)
+    top, bottom = min(y1, y2), max(y1, y2)
+    return max(left, 0), max(top, 0), min(right + 1, width), min(bottom + 1, height)
+
+
+def blend_box(result, x1, y1, x2, y2, fill_color, fill_alpha):
+    # Полупрозрачная заливка смешивается только внутри рамки, без копии всего кадра.
+    # Вне рамки addWeighted по всему кадру пиксели не меняет, поэтому результат совпадает попиксельно.
+    height, width = result.shape[:2]
+    left, top, right, bottom = clip_box(x1, y1, x2, y2, width, height)
+    if left >= right or top >= bottom:
+        return
+
+    roi = result[top:bottom, left:right]
+    fill = fill_canvas(result.shape, fill_color)[top:bottom, left:right]
+    cv2.addWeighted(fill, fill_alpha, roi, 1 - fill_alpha, 0, roi)
+
+
+def draw_corners(result, x1, y1, x2, y2, color, corner_size, corner_thickness):
+    cv2.line(result, (x1, y1), (x1 + corner_size, y1), color, corner_thickness)
+    cv2.line(result, (x1, y1), (x1, y1 + corner_size), color, corner_thickness)
+    cv2.line(result, (x2, y1), (x2 - corner_size, y1), color, corner_thickness)
+    cv2.line(result, (x2, y1), (x2, y1 + corner_size), color, corner_thickness)
+    cv2.line(result, (x1, y2), (x1 + corner_size, y2), color, corner_thickness)
+    cv2.line(result, (x1, y2), (x1, y2 - corner_size), color, corner_thickness)
+    cv2.line(result, (x2, y2), (x2 - corner_size, y2), color, corner_thickness)
+    cv2.line(result, (x2, y2), (x2, y2 - corner_size), color, corner_thickness)
+
+
+def render_normal(frame, detections, styles):
+    result = frame.copy()
+
+    # Порядок слоев как раньше: SAFE -> CAUTION -> DANGER, внутри категории - порядок детекций
+    for code in (SAFE, CAUTION, DANGER):
+        style = styles[code]
+        color = style['color']
+        thickness = style['thickness']
+        fill_color = style['fill_color']
+        fill_alpha = style['fill_alpha']
+
+        for x1, y1, x2, y2 in detections.bboxes[detections.categories == code].tolist():
+            blend_box(result, x1, y1, x2, y2, fill_color, fill_alpha)
+            cv2.rectangle(result, (x1, y1), (x2, y2), color, thickness)
+            draw_corners(result, x1, y1, x2, y2, color, 8, 2)
+
+    return result
+
+
+def render_emergency(frame, detections, styles):
+    result = frame.copy()
+
+    # Показываются только зоны самой безопасной из найденных категорий
+    counts = detections.category_counts()
+
+    priority_category = None
+    for code in (SAFE, CAUTION, DANGER):
+        if counts[code] > 0:
+            priority_category = code
+            break
+
+    if priority_category is None:
+        return result
+
+    style = styles[priority_category]
+    color = style['color']
+    fill_color = style['fill_color']
+
+    enhanced_alpha = style['fill_alpha'] + 0.15
+    enhanced_thickness = style['thickness'] + 1
+    inner_offset = 5
+
+    for x1, y1, x2, y2 in detections.bboxes[detections.categories == priority_category].tolist():
+        blend_box(result, x1, y1, x2, y2, fill_color, enhanced_alpha)
+        cv2.rectangle(result, (x1, y1), (x2, y2), color, enhanced_thickness)
+        draw_corners(result, x1, y1, x2, y2, color, 12, 3)
+
+        if priority_category == SAFE:
+            cv2.line(result, (x1 + inner_offset, y1 + inner_offset),
+                     (x2 - inner_offset, y2 - inner_offset), (0, 200, 0), 1)
+            cv2.line(result, (x2 - inner_offset, y1 + inner_offset),
+                     (x1 + inner_offset, y2 - inner_offset), (0, 200, 0), 1)
+        elif priority_category == CAUTION:
+            center_y = (y1 + y2) // 2
+            cv2.line(result, (x1 + inner_offset, center_y),
+                     (x2 - inner_offset, center_y), (0, 200, 200), 1)
+        elif priority_category == DANGER:
+            quarter_x1 = x1 + (x2 - x1) // 4
+            quarter_x2 = x2 - (x2 - x1) // 4
+            cv2.line(result, (quarter_x1, y1 + inner_offset),
+                     (quarter_x1, y2 - inner_offset), (0, 0, 200), 1)
+            cv2.line(result, (quarter_x2, y1 + inner_offset),
+                     (quarter_x2, y2 - inner_offset), (0, 0, 200), 1)
+
+    return result
@@ -1,117 +1,37 @@
-from ultralytics import YOLO
 import cv2
 import time
 import os
 import threading
 import numpy as np
 
-SAFETY_CATEGORIES = {
-    'SAFE': {
-        'color': (0, 255, 0),
-        'thickness': 3,
-        'fill_color': (0, 255, 0),
-        'fill_alpha': 0.4,
-        'description': 'Безопасно - можно садиться'
-    },
-    'CAUTION': {
-        'color': (0, 255, 255),
-        'thickness': 2,
-        'fill_color': (0, 255, 255),
-        'fill_alpha': 0.3,
-        'description': 'Осторожно - садиться нежелательно'
-    },
-    'DANGER': {
-        'color': (0, 0, 255),
-        'thickness': 2,
-        'fill_color': (0, 0, 255),
-        'fill_alpha': 0.25,
-        'description': 'Опасно - избегать посадки'
-    }
-}
-
-SAFETY_CLASSIFICATION = {
-    'building': 'DANGER',
-    'ar-marker': 'CAUTION',
-    'bald-tree': 'DANGER',
-    'bicycle': 'DANGER',
-    'car': 'DANGER',
-    'dirt': 'SAFE',
-    'dog': 'DANGER',
-    'door': 'DANGER',
-    'fence': 'DANGER',
-    'fence-pole': 'DANGER',
-    'grass': 'SAFE',
-    'gravel': 'CAUTION',
-    'human': 'DANGER',
-    'log': 'DANGER',
-    'metal': 'DANGER',
-    'misc': 'CAUTION',
-    'mobile-home': 'DANGER',
-    'other': 'CAUTION',
-    'pickup-truck': 'DANGER',
-    'pole': 'DANGER',
-    'rocks': 'DANGER',
-    'sand': 'SAFE',
-    'tree': 'DANGER',
-    'wood': 'DANGER',
-    'small-vehicle': 'DANGER',
-    'large-vehicle': 'DANGER',
-    'buildings': 'DANGER',
-    'road': 'CAUTION',
-    'vegetation': 'SAFE',
-    'waterbody': 'DANGER',
-}
-
-models_config = {
-    'model_2': {
-        'path': 'runs/landcover_yolo_model2/weights/best.pt',
-        'display_name': 'Building',
-        'classes': ['building']
-    },
-    'model_4': {
-        'path': 'runs/landcover_yolo_model4/weights/best.pt',
-        'display_name': 'Objects',
-        'classes': [
-            'ar-marker', 'bald-tree', 'bicycle', 'car', 'dirt',
-            'dog', 'door', 'fence', 'fence-pole', 'grass', 'gravel',
-            'human', 'log', 'metal', 'misc', 'mobile-home', 'other',
-            'pickup-truck', 'pole', 'rocks', 'sand', 'tree', 'wood'
-        ]
-    },
-    'model_14': {
-        'path': 'runs/landcover_yolo_model14/weights/best.pt',
-        'display_name': 'Vehicles',
-        'classes': ['small-vehicle', 'large-vehicle', 'human']
-    },
-    'model_15': {
-        'path': 'runs/landcover_yolo_model15/weights/best.pt',
-        'display_name': 'Landcover',
-        'classes': ['buildings', 'road', 'vegetation', 'waterbody']
-    }
-}
-
-models = {}
-for key, config in models_config.items():
-    if os.path.exists(config['path']):
-        try:
-            model = YOLO(config['path'])
-            models[key] = {
-                'model': model,
-                'display_name': config['display_name'],
-                'classes': config['classes']
-            }
-            print(f"{config['display_name']}: {len(config['classes'])} классов")
-        except Exception as e:
-            print(f"Ошибка загрузки {key}: {e}")
-            continue
-    else:
-        print(f"Модель не найдена: {config['path']}")
+from Controls import KEY_ESC, KEY_SPACE, KEY_TOGGLE, open_controls
+from Detections import SAFE, CAUTION, DANGER, DetectionBatch
+from Inference import AdaptiveStride, InferencePool, ModelSchedule
+from Landing import (
+    CATEGORY_STYLES, DISPLAY_HEIGHT, DISPLAY_WIDTH, SAFETY_CLASSIFICATION, STARTUP_START,
+    detect_model, detect_model_tiled, load_models, preprocess_frame, print_startup_report,
+    print_tiling_stats, tiled_input
+)
+from Pipeline import STOP, DecoderStage, Stage, WriterStage, get_until_stopped
+from Render import render_emergency, render_normal
+from Tracker import BoxTracker
+from Video import HeldFrameWriter
+
+# Одна объединенная модель (Fuse.py) вместо четырех отдельных
+USE_FUSED_MODEL = False
+
+# Бэкенд моделей: 'auto' - самый быстрый из доступных (в том числе INT8 после Quantize.py),
+# либо явно 'openvino_int8', 'openvino', 'onnx', 'pytorch'
+INFERENCE_BACKEND = 'auto'
+
+models = load_models(fused=USE_FUSED_MODEL, backend=INFERENCE_BACKEND)
 
 if not models:
     print("Нет доступных моделей")
     exit()
 
 print(f"\nЗагружено моделей: {len(models)}")
+print_startup_report(models)
 
 category_counts = {'SAFE': 0, 'CAUTION': 0, 'DANGER': 0}
 for class_name, category in SAFETY_CLASSIFICATION.items():
@@ -128,11 +48,23 @@ fps = int(cap.get(cv2.CAP_PROP_FPS))
 width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
 height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
 
-DISPLAY_WIDTH = 1280
-DISPLAY_HEIGHT = 720
+# Общий срок в секундах на инференс всех моделей одного кадра
+INFERENCE_BUDGET = 0.8
+
+# Модели с tile_budget в конфиге (мелкие объекты) ищут рамки по плиткам кадра в исходном разрешении,
+# число плиток подстраивается под бюджет задержки (Tiling.py)
+USE_TILED_INFERENCE = False
 
-PROCESS_WIDTH = 640
-PROCESS_HEIGHT = 360
+# Трекер переносит рамки между кадрами с инференсом по скорости объектов
+USE_TRACKER = True
+
+# На паузе вместо повторного кодирования одного и того же кадра
+# в видео пишется один кадр, а длительность паузы - в файл меток *_holds.csv
+HOLD_PAUSED_FRAMES = False
+
+# Источник управления: 'window' - окно и клавиатура, 'stdin', 'tcp:PORT' или путь к файлу сценария.
+# Без окна кадры не показываются, и цикл идет со скоростью чтения, инференса и записи
+CONTROLS = os.environ.get('LANDING_CONTROLS', 'window')
 
 # СОХРАНЕНИЕ ДВУХ ФАЙЛОВ
 output_path_normal = 'Test_normal_mode_output.mp4'
@@ -144,212 +76,102 @@ out_normal = cv2.VideoWriter(output_path_normal, fourcc, fps, (DISPLAY_WIDTH, DI
 # Видео для аварийного режима
 out_emergency = cv2.VideoWriter(output_path_emergency, fourcc, fps, (DISPLAY_WIDTH, DISPLAY_HEIGHT))
 
+if HOLD_PAUSED_FRAMES:
+    out_normal = HeldFrameWriter(out_normal, output_path_normal)
+    out_emergency = HeldFrameWriter(out_emergency, output_path_emergency)
+
+# Кодирование каждого файла в отдельном потоке
+out_normal = WriterStage(out_normal, name='writer-normal')
+out_emergency = WriterStage(out_emergency, name='writer-emergency')
+
 is_emergency = False
 show_detections = True
 pause_frame = None
-pause_detections = []
+pause_detections = DetectionBatch.empty()
+# Кадры паузы для обоих режимов, сбрасываются при смене состояния (пауза, подсветка)
+paused_frames = None
 current_frame_normal = None
 current_frame_emergency = None
 
+# Списки классов по номеру модели для восстановления имен из DetectionBatch
+class_tables = [model_data['classes'] for model_data in models.values()]
 
-def get_safety_category(class_name):
-    class_name_lower = class_name.lower()
-
-    if class_name_lower in SAFETY_CLASSIFICATION:
-        return SAFETY_CLASSIFICATION[class_name_lower]
-
-    for key, category in SAFETY_CLASSIFICATION.items():
-        if key in class_name_lower or class_name_lower in key:
-            return category
-
-    return 'DANGER'
-
-
-def detect_model(model_key, model_data, frame):
-    small_frame = cv2.resize(frame, (PROCESS_WIDTH, PROCESS_HEIGHT))
-
-    conf_threshold = 0.5
-    max_det = 40
-
-    if model_key == 'model_4':
-        conf_threshold = 0.3
-        max_det = 60
-
-    results = model_data['model'](
-        small_frame,
-        imgsz=320,
-        conf=conf_threshold,
-        verbose=False,
-        max_det=max_det
-    )
-
-    detections = []
-    for r in results:
-        if r.boxes is not None:
-            for box in r.boxes:
-                x1, y1, x2, y2 = map(int, box.xyxy[0])
-                scale_x = DISPLAY_WIDTH / PROCESS_WIDTH
-                scale_y = DISPLAY_HEIGHT / PROCESS_HEIGHT
-                x1, y1, x2, y2 = int(x1 * scale_x), int(y1 * scale_y), int(x2 * scale_x), int(y2 * scale_y)
 
-                conf = float(box.conf[0])
-                cls_id = int(box.cls[0]) if hasattr(box, 'cls') and box.cls is not None else 0
+def detect_all_models(frame, timestamp=None):
+    # Без времени кадра (снимок на паузе) запускаются все модели,
+    # иначе только те, чья очередь пришла по расписанию, остальные берут последний результат
+    if timestamp is None:
+        results = inference_pool.run(frame, budget=INFERENCE_BUDGET)
+        return DetectionBatch.concat([results[key] for key in models if key in results])
 
-                class_name = ""
-                if cls_id < len(model_data['classes']):
-                    class_name = model_data['classes'][cls_id]
-                else:
-                    class_name = f"class_{cls_id}"
+    results = inference_pool.run(frame, budget=INFERENCE_BUDGET, keys=model_schedule.due(timestamp))
+    model_schedule.update(timestamp, results)
+    return DetectionBatch.concat(model_schedule.latest_results())
 
-                safety_category = get_safety_category(class_name)
-                safety_info = SAFETY_CATEGORIES[safety_category]
 
-                detections.append({
-                    'bbox': (x1, y1, x2, y2),
-                    'confidence': conf,
-                    'class_id': cls_id,
-                    'class_name': class_name,
-                    'safety_category': safety_category,
-                    'color': safety_info['color'],
-                    'thickness': safety_info['thickness'],
-                    'fill_color': safety_info['fill_color'],
-                    'fill_alpha': safety_info['fill_alpha'],
-                    'model_name': model_key,
-                    'display_name': model_data['display_name']
-                })
+def draw_normal_mode(frame, detections):
+    if not show_detections:
+        return frame.copy()
 
-    return detections
+    return render_normal(frame, detections, CATEGORY_STYLES)
 
 
-def detect_all_models(frame):
-    detections = []
-    threads = []
-    results = {}
+def draw_emergency_mode_clean(frame, detections):
+    if not show_detections:
+        return frame.copy()
 
-    for key, model_data in models.items():
-        thread = threading.Thread(
-            target=lambda k=key, m=model_data: results.update({k: detect_model(k, m, frame)})
-        )
-        threads.append(thread)
-        thread.start()
+    return render_emergency(frame, detections, CATEGORY_STYLES)
 
-    for thread in threads:
-        thread.join(timeout=0.8)
 
-    for key, model_dets in results.items():
-        detections.extend(model_dets)
+def inference_stage(item):
+    global last_detections
+    frame_index, frame = item
 
-    return detections
+    display_frame = cv2.resize(frame, (DISPLAY_WIDTH, DISPLAY_HEIGHT))
 
+    # Кадр для инференса выбирается по задержке моделей и изменению сцены
+    if inference_stride.should_infer(display_frame):
+        inference_start = time.perf_counter()
+        last_detections = detect_all_models(model_input(frame), frame_index / inference_stride.fps)
+        inference_stride.update_latency(time.perf_counter() - inference_start)
 
-def draw_normal_mode(frame, detections):
-    result = frame.copy()
+        if USE_TRACKER:
+            fresh_models = [models[key]['model_id'] for key in model_schedule.fresh]
+            box_tracker.update(last_detections, frame_index, fresh_models)
 
-    if not show_detections:
-        return result
-
-    danger_detections = [d for d in detections if d['safety_category'] == 'DANGER']
-    caution_detections = [d for d in detections if d['safety_category'] == 'CAUTION']
-    safe_detections = [d for d in detections if d['safety_category'] == 'SAFE']
+    if USE_TRACKER:
+        # На кадрах без инференса рамки сдвигаются по прогнозу трекера
+        return frame_index, frame, display_frame, box_tracker.predict(frame_index)
 
-    for category_detections in [safe_detections, caution_detections, danger_detections]:
-        for det in category_detections:
-            x1, y1, x2, y2 = det['bbox']
-            color = det['color']
-            thickness = det['thickness']
-            fill_color = det['fill_color']
-            fill_alpha = det['fill_alpha']
+    return frame_index, frame, display_frame, last_detections
 
-            overlay = result.copy()
-            cv2.rectangle(overlay, (x1, y1), (x2, y2), fill_color, -1)
-            cv2.addWeighted(overlay, fill_alpha, result, 1 - fill_alpha, 0, result)
 
-            cv2.rectangle(result, (x1, y1), (x2, y2), color, thickness)
+def render_stage(item):
+    frame_index, frame, display_frame, detections = item
 
-            corner_size = 8
-            cv2.line(result, (x1, y1), (x1 + corner_size, y1), color, 2)
-            cv2.line(result, (x1, y1), (x1, y1 + corner_size), color, 2)
-            cv2.line(result, (x2, y1), (x2 - corner_size, y1), color, 2)
-            cv2.line(result, (x2, y1), (x2, y1 + corner_size), color, 2)
-            cv2.line(result, (x1, y2), (x1 + corner_size, y2), color, 2)
-            cv2.line(result, (x1, y2), (x1, y2 - corner_size), color, 2)
-            cv2.line(result, (x2, y2), (x2 - corner_size, y2), color, 2)
-            cv2.line(result, (x2, y2), (x2, y2 - corner_size), color, 2)
+    # Генерация кадров для обоих режимов
+    normal_frame = draw_normal_mode(display_frame, detections)
+    emergency_frame = draw_emergency_mode_clean(display_frame, detections)
 
-    return result
+    return frame_index, frame, display_frame, normal_frame, emergency_frame
 
 
-def draw_emergency_mode_clean(frame, detections):
-    result = frame.copy()
+# Пул инференса создается один раз и переиспользуется на каждом кадре
+if USE_TILED_INFERENCE:
+    inference_pool = InferencePool(models, detect_model_tiled)
+    model_input = tiled_input
+else:
+    inference_pool = InferencePool(models, detect_model)
+    model_input = preprocess_frame
+inference_stride = AdaptiveStride(fps)
+model_schedule = ModelSchedule(models)
+box_tracker = BoxTracker()
 
-    if not show_detections:
-        return result
-
-    safe_detections = [d for d in detections if d['safety_category'] == 'SAFE']
-    caution_detections = [d for d in detections if d['safety_category'] == 'CAUTION']
-    danger_detections = [d for d in detections if d['safety_category'] == 'DANGER']
-
-    if len(safe_detections) > 0:
-        priority_detections = safe_detections
-    elif len(caution_detections) > 0:
-        priority_detections = caution_detections
-    elif len(danger_detections) > 0:
-        priority_detections = danger_detections
-    else:
-        priority_detections = []
-
-    for det in priority_detections:
-        x1, y1, x2, y2 = det['bbox']
-        color = det['color']
-        thickness = det['thickness']
-        fill_color = det['fill_color']
-        fill_alpha = det['fill_alpha']
-
-        enhanced_alpha = fill_alpha + 0.15
-
-        overlay = result.copy()
-        cv2.rectangle(overlay, (x1, y1), (x2, y2), fill_color, -1)
-        cv2.addWeighted(overlay, enhanced_alpha, result, 1 - enhanced_alpha, 0, result)
-
-        enhanced_thickness = thickness + 1
-        cv2.rectangle(result, (x1, y1), (x2, y2), color, enhanced_thickness)
-
-        corner_size = 12
-        corner_thickness = 3
-
-        cv2.line(result, (x1, y1), (x1 + corner_size, y1), color, corner_thickness)
-        cv2.line(result, (x1, y1), (x1, y1 + corner_size), color, corner_thickness)
-        cv2.line(result, (x2, y1), (x2 - corner_size, y1), color, corner_thickness)
-        cv2.line(result, (x2, y1), (x2, y1 + corner_size), color, corner_thickness)
-        cv2.line(result, (x1, y2), (x1 + corner_size, y2), color, corner_thickness)
-        cv2.line(result, (x1, y2), (x1, y2 - corner_size), color, corner_thickness)
-        cv2.line(result, (x2, y2), (x2 - corner_size, y2), color, corner_thickness)
-        cv2.line(result, (x2, y2), (x2, y2 - corner_size), color, corner_thickness)
-
-        inner_offset = 5
-        if det['safety_category'] == 'SAFE':
-            cv2.line(result, (x1 + inner_offset, y1 + inner_offset),
-                     (x2 - inner_offset, y2 - inner_offset), (0, 200, 0), 1)
-            cv2.line(result, (x2 - inner_offset, y1 + inner_offset),
-                     (x1 + inner_offset, y2 - inner_offset), (0, 200, 0), 1)
-        elif det['safety_category'] == 'CAUTION':
-            center_y = (y1 + y2) // 2
-            cv2.line(result, (x1 + inner_offset, center_y),
-                     (x2 - inner_offset, center_y), (0, 200, 200), 1)
-        elif det['safety_category'] == 'DANGER':
-            quarter_x1 = x1 + (x2 - x1) // 4
-            quarter_x2 = x2 - (x2 - x1) // 4
-            cv2.line(result, (quarter_x1, y1 + inner_offset),
-                     (quarter_x1, y2 - inner_offset), (0, 0, 200), 1)
-            cv2.line(result, (quarter_x2, y1 + inner_offset),
-                     (quarter_x2, y2 - inner_offset), (0, 0, 200), 1)
-
-    return result
-
-
-cv2.namedWindow('Emergency Landing System', cv2.WINDOW_NORMAL)
+controls = open_controls(CONTROLS, 'Emergency Landing System', fps)
 frame_count = 0
-last_detections = []
+# Число записанных кадров, включая кадры паузы, - по нему идет сценарий управления
+step = 0
+last_detections = DetectionBatch.empty()
 start_time = time.time()
 
 print(f"\n Запуск системы посадки...")
@@ -357,6 +179,8 @@ print("Управление:")
 print("  SPACE - Аварийный режим/Пауза (показывает приоритетные зоны)")
 print("  1     - Вкл/Выкл подсветку объектов")
 print("  ESC   - Выход")
+if CONTROLS != 'window':
+    print(f"  Без окна, команды из {CONTROLS}: space, 1, esc")
 print("\nВ аварийном режиме:")
 print("  ТОЛЬКО зеленые зоны (если есть)")
 print("  ТОЛЬКО желтые зоны (если нет зеленых)")
@@ -365,26 +189,31 @@ print(f"\nСохранение двух видео:")
 print(f"  Штатный режим: {output_path_normal}")
 print(f"  Аварийный режим: {output_path_emergency}")
 
+# Конвейер: чтение -> инференс -> отрисовка идут в своих потоках через ограниченные очереди,
+# главный поток только показывает кадры, обрабатывает клавиши и передает кадры в потоки записи
+stop_event = threading.Event()
+decoder = DecoderStage(cap, stop_event)
+inference = Stage('inference', inference_stage, decoder.outbox, stop_event)
+renderer = Stage('render', render_stage, inference.outbox, stop_event)
+pipeline_stages = [decoder, inference, renderer]
+for stage in pipeline_stages:
+    stage.start()
+
 while True:
     if not is_emergency:
-        ret, frame = cap.read()
-        if not ret:
+        item = get_until_stopped(renderer.outbox, stop_event)
+        if item is STOP:
             break
 
-        frame_count += 1
-
-        if frame_count % 3 == 0:
-            display_frame = cv2.resize(frame, (DISPLAY_WIDTH, DISPLAY_HEIGHT))
-            last_detections = detect_all_models(display_frame)
-        else:
-            display_frame = cv2.resize(frame, (DISPLAY_WIDTH, DISPLAY_HEIGHT))
+        frame_count, frame, display_frame, normal_frame, emergency_frame = item
     else:
-        display_frame = cv2.resize(pause_frame, (DISPLAY_WIDTH, DISPLAY_HEIGHT))
-        last_detections = pause_detections
-
-    # Генерация кадров для обоих режимов
-    normal_frame = draw_normal_mode(display_frame, last_detections)
-    emergency_frame = draw_emergency_mode_clean(display_frame, last_detections)
+        # Статичный кадр паузы отрисовывается один раз и переиспользуется
+        if paused_frames is None:
+            paused_frames = (
+                draw_normal_mode(pause_frame, pause_detections),
+                draw_emergency_mode_clean(pause_frame, pause_detections)
+            )
+        normal_frame, emergency_frame = paused_frames
 
     # Сохранение в оба видеофайла
     out_normal.write(normal_frame)
@@ -392,24 +221,26 @@ while True:
 
     # Отображение текущего режима
     if is_emergency:
-        cv2.imshow('Emergency Landing System', emergency_frame)
+        controls.show(emergency_frame)
     else:
-        cv2.imshow('Emergency Landing System', normal_frame)
+        controls.show(normal_frame)
 
-    key = cv2.waitKey(1) & 0xFF
+    step += 1
+    if step == 1:
+        print(f"\nПервый кадр через {time.perf_counter() - STARTUP_START:.2f} с после запуска")
+    key = controls.poll(step, paused=is_emergency)
 
-    if key == 27:
+    if key == KEY_ESC:
         break
-    elif key == 32:
+    elif key == KEY_SPACE:
         is_emergency = not is_emergency
+        paused_frames = None
         if is_emergency:
-            pause_frame = cv2.resize(frame, (DISPLAY_WIDTH, DISPLAY_HEIGHT))
+            pause_frame = display_frame
             print(f"\n АВАРИЙНЫЙ РЕЖИМ на кадре {frame_count}")
-            pause_detections = detect_all_models(pause_frame)
+            pause_detections = detect_all_models(model_input(frame))
 
-            safe_count = len([d for d in pause_detections if d['safety_category'] == 'SAFE'])
-            caution_count = len([d for d in pause_detections if d['safety_category'] == 'CAUTION'])
-            danger_count = len([d for d in pause_detections if d['safety_category'] == 'DANGER'])
+            safe_count, caution_count, danger_count = pause_detections.category_counts().tolist()
 
             print(f" Обнаружено зон:")
             print(f"  Безопасные зоны: {safe_count}")
@@ -417,37 +248,47 @@ while True:
             print(f"  Опасные зоны: {danger_count}")
 
             if safe_count > 0:
-                safe_classes = list(set([d['class_name'] for d in pause_detections if d['safety_category'] == 'SAFE']))
+                safe_classes = list(set(pause_detections.by_category(SAFE).class_names(class_tables)))
                 print(f" Показываются: ТОЛЬКО зеленые зоны")
                 print(f" Безопасные поверхности: {', '.join(safe_classes[:3])}")
             elif caution_count > 0:
-                caution_classes = list(
-                    set([d['class_name'] for d in pause_detections if d['safety_category'] == 'CAUTION']))
+                caution_classes = list(set(pause_detections.by_category(CAUTION).class_names(class_tables)))
                 print(f" Показываются: ТОЛЬКО желтые зоны")
                 print(f" Поверхности с осторожностью: {', '.join(caution_classes[:3])}")
             elif danger_count > 0:
-                danger_classes = list(
-                    set([d['class_name'] for d in pause_detections if d['safety_category'] == 'DANGER']))
+                danger_classes = list(set(pause_detections.by_category(DANGER).class_names(class_tables)))
                 print(f" Показываются: ТОЛЬКО красные зоны")
                 print(f" Опасные поверхности: {', '.join(danger_classes[:3])}")
             else:
                 print(f" Зоны не обнаружены!")
         else:
             print(f"\n Возврат в обычный режим")
-    elif key == 49:
+    elif key == KEY_TOGGLE:
         show_detections = not show_detections
+        paused_frames = None
         if show_detections:
             print(f"\n Подсветка объектов ВКЛЮЧЕНА")
         else:
             print(f"\n️ Подсветка объектов ВЫКЛЮЧЕНА")
 
+stop_event.set()
+for stage in pipeline_stages:
+    stage.join(timeout=1.0)
+
+inference_pool.close()
 cap.release()
 out_normal.release()
 out_emergency.release()
-cv2.destroyAllWindows()
+controls.close()
 
 print(f"\nСистема посадки завершила работу!")
 print(f"Сохранены видеофайлы:")
 print(f"  1. Штатный режим: {output_path_normal}")
 print(f"  2. Аварийный режим: {output_path_emergency}")
-print(f"Обработано кадров: {frame_count}")
\ No newline at end of file
+print(f"Обработано кадров: {frame_count}")
+
+inference_pool.print_latency_stats()
+inference_stride.print_stats()
+model_schedule.print_stats()
+if USE_TILED_INFERENCE:
+    print_tiling_stats(models)
\ No newline at end of file
@@ -0,0 +1,96 @@
+import math
+
+import numpy as np
+
+from Tracker import iou_matrix
+
+# Сетки плиток (столбцы, строки) по возрастанию стоимости; (1, 1) - весь кадр одной плиткой
+TILE_LEVELS = ((1, 1), (2, 1), (2, 2), (3, 2), (4, 3))
+
+
+def tile_grid(width, height, cols, rows, overlap=0.2):
+    """Плитки одного размера (x1, y1, x2, y2), покрывающие кадр с перекрытием overlap.
+
+    Одинаковый размер нужен, чтобы все плитки ушли в модель одним батчем.
+    """
+    tile_width = min(width, math.ceil(width / (cols - (cols - 1) * overlap)))
+    tile_height = min(height, math.ceil(height / (rows - (rows - 1) * overlap)))
+    xs = np.linspace(0, width - tile_width, cols).round().astype(int).tolist()
+    ys = np.linspace(0, height - tile_height, rows).round().astype(int).tolist()
+    return [(x, y, x + tile_width, y + tile_height) for y in ys for x in xs]
+
+
+def cross_tile_nms(detections, iou_threshold=0.5):
+    """Индексы рамок после NMS по всем плиткам.
+
+    Объект в зоне перекрытия находится в нескольких плитках; из пересекающихся рамок
+    одной модели и одного класса остается рамка с наибольшей уверенностью.
+    """
+    order = np.argsort(-detections.confidences, kind='stable')
+    boxes = detections.bboxes[order].astype(np.float32)
+    model_ids = detections.model_ids[order]
+    class_ids = detections.class_ids[order]
+
+    same_class = (model_ids[:, None] == model_ids[None, :]) & (class_ids[:, None] == class_ids[None, :])
+    overlaps = np.where(same_class, iou_matrix(boxes, boxes), 0.0) > iou_threshold
+
+    suppressed = np.zeros(len(order), dtype=bool)
+    keep = []
+    for i in range(len(order)):
+        if suppressed[i]:
+            continue
+        keep.append(i)
+        suppressed |= overlaps[i]
+
+    return order[keep]
+
+
+class TileBudget:
+    """Выбор сетки плиток по бюджету задержки одного вызова модели.
+
+    Задержка сглаживается; если она выше бюджета, сетка становится крупнее, если
+    прогноз для следующей сетки (задержка на плитку, умноженная на число плиток)
+    укладывается в headroom * budget - мельче. Так мелкие объекты ищутся
+    на стольких плитках, сколько позволяет бюджет, а не на фиксированной сетке.
+    """
+
+    def __init__(self, budget, overlap=0.2, levels=TILE_LEVELS, headroom=0.9):
+        self.budget = budget
+        self.overlap = overlap
+        self.levels = levels
+        self.headroom = headroom
+        self.level = 0
+        self.latency = None
+        self.calls = 0
+        self.level_calls = [0] * len(levels)
+
+    def grid(self):
+        return self.levels[self.level]
+
+    def tiles(self, width, height):
+        cols, rows = self.grid()
+        return tile_grid(width, height, cols, rows, self.overlap)
+
+    def update(self, seconds):
+        self.latency = seconds if self.latency is None else 0.7 * self.latency + 0.3 * seconds
+        self.calls += 1
+        self.level_calls[self.level] += 1
+
+        cols, rows = self.grid()
+        per_tile = self.latency / (cols * rows)
+
+        if self.latency > self.budget and self.level > 0:
+            self.level -= 1
+            self.latency = per_tile * math.prod(self.grid())
+        elif self.level + 1 < len(self.levels):
+            next_cols, next_rows = self.levels[self.level + 1]
+            if per_tile * next_cols * next_rows <= self.headroom * self.budget:
+                self.level += 1
+                self.latency = per_tile * next_cols * next_rows
+
+    def print_stats(self, name):
+        used = ", ".join(
+            f"{cols}x{rows}: {count}" for (cols, rows), count in zip(self.levels, self.level_calls) if count
+        )
+        latency_ms = (self.latency or 0.0) * 1000
+        print(f"  {name}: бюджет {self.budget * 1000:.0f} мс, задержка {latency_ms:.1f} мс, сетки ({used})")
@@ -0,0 +1,150 @@
+import numpy as np
+
+from Detections import DetectionBatch
+
+
+def iou_matrix(boxes_a, boxes_b):
+    # Попарный IoU двух наборов рамок (x1, y1, x2, y2), без циклов по рамкам
+    x1 = np.maximum(boxes_a[:, None, 0], boxes_b[None, :, 0])
+    y1 = np.maximum(boxes_a[:, None, 1], boxes_b[None, :, 1])
+    x2 = np.minimum(boxes_a[:, None, 2], boxes_b[None, :, 2])
+    y2 = np.minimum(boxes_a[:, None, 3], boxes_b[None, :, 3])
+    intersection = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+
+    area_a = (boxes_a[:, 2] - boxes_a[:, 0]) * (boxes_a[:, 3] - boxes_a[:, 1])
+    area_b = (boxes_b[:, 2] - boxes_b[:, 0]) * (boxes_b[:, 3] - boxes_b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - intersection
+
+    return intersection / np.maximum(union, 1e-6)
+
+
+def center_affinity(track_boxes, det_boxes, max_shift=1.0):
+    # 1.0 при совпадении центров, 0.0 при сдвиге центра на max_shift размеров рамки трека и дальше
+    track_centers = (track_boxes[:, :2] + track_boxes[:, 2:]) / 2
+    det_centers = (det_boxes[:, :2] + det_boxes[:, 2:]) / 2
+    distance = np.linalg.norm(track_centers[:, None, :] - det_centers[None, :, :], axis=2)
+    size = np.maximum(track_boxes[:, 2] - track_boxes[:, 0], track_boxes[:, 3] - track_boxes[:, 1])
+    return np.clip(1.0 - distance / (max_shift * np.maximum(size, 1.0))[:, None], 0.0, None)
+
+
+def greedy_match(iou, threshold):
+    # Жадное сопоставление: пары с наибольшим IoU забираются первыми
+    pairs = np.argwhere(iou >= threshold)
+    order = np.argsort(-iou[pairs[:, 0], pairs[:, 1]], kind='stable')
+
+    matched_tracks = set()
+    matched_detections = set()
+    matches = []
+    for track, detection in pairs[order].tolist():
+        if track in matched_tracks or detection in matched_detections:
+            continue
+        matched_tracks.add(track)
+        matched_detections.add(detection)
+        matches.append((track, detection))
+
+    return matches
+
+
+class BoxTracker:
+    """Легкий IoU-трекер с моделью постоянной скорости.
+
+    На кадрах с инференсом детекции сопоставляются с треками той же модели и того же
+    класса, скорость рамки (пикселей за кадр) сглаживается. На кадрах без инференса
+    рамки сдвигаются по скорости, поэтому не отстают от движущихся объектов.
+    Треки моделей, которые не запускались на этом кадре (по расписанию), не обновляются,
+    а только прогнозируются.
+    """
+
+    def __init__(self, iou_threshold=0.3, max_misses=2, max_predict_frames=15, velocity_smoothing=0.5,
+                 max_center_shift=2.0):
+        self.iou_threshold = iou_threshold
+        self.max_center_shift = max_center_shift
+        self.max_misses = max_misses
+        self.max_predict_frames = max_predict_frames
+        self.velocity_smoothing = velocity_smoothing
+        self.next_id = 0
+        self.reset()
+
+    def reset(self):
+        self.boxes = np.empty((0, 4), dtype=np.float32)
+        self.velocities = np.empty((0, 4), dtype=np.float32)
+        self.updated_at = np.empty(0, dtype=np.int64)
+        self.misses = np.empty(0, dtype=np.int32)
+        self.track_ids = np.empty(0, dtype=np.int32)
+        self.detections = DetectionBatch.empty()
+
+    def __len__(self):
+        return len(self.track_ids)
+
+    def update(self, detections, frame_index, fresh_models=None):
+        if fresh_models is None:
+            fresh_models = np.unique(np.concatenate([detections.model_ids, self.detections.model_ids]))
+        fresh_models = np.asarray(list(fresh_models), dtype=np.int8)
+
+        # Детекции и треки моделей, запущенных на этом кадре; остальные треки остаются как есть
+        detections = detections.select(np.isin(detections.model_ids, fresh_models))
+        active = np.isin(self.detections.model_ids, fresh_models)
+        active_index = np.flatnonzero(active)
+
+        # Детекции сопоставляются с тем местом, где трек должен быть сейчас, а не где его видели
+        det_boxes = detections.bboxes.astype(np.float32)
+        elapsed = np.clip(frame_index - self.updated_at[active_index], 0, self.max_predict_frames)[:, None]
+        predicted = self.boxes[active_index] + self.velocities[active_index] * elapsed
+        same_class = ((self.detections.model_ids[active_index, None] == detections.model_ids[None, :]) &
+                      (self.detections.class_ids[active_index, None] == detections.class_ids[None, :]))
+        matches = greedy_match(np.where(same_class, iou_matrix(predicted, det_boxes), 0.0), self.iou_threshold)
+
+        # У нового трека скорости еще нет, и при большом шаге инференса быстрый объект уходит
+        # из старой рамки почти целиком; оставшиеся пары сопоставляются по сдвигу центра
+        matched_tracks = [track for track, _ in matches]
+        matched_dets = [detection for _, detection in matches]
+        affinity = np.where(same_class, center_affinity(predicted, det_boxes, self.max_center_shift), 0.0)
+        affinity[matched_tracks, :] = 0.0
+        affinity[:, matched_dets] = 0.0
+        matches += greedy_match(affinity, 1e-6)
+
+        track_index = np.array([active_index[track] for track, _ in matches], dtype=np.int64)
+        det_index = np.array([detection for _, detection in matches], dtype=np.int64)
+
+        # Обновление сопоставленных треков: новая рамка и сглаженная скорость
+        if len(matches):
+            # Скорость считается от последней наблюдаемой рамки, а не от прогноза
+            elapsed = np.maximum(frame_index - self.updated_at[track_index], 1)[:, None]
+            measured = (det_boxes[det_index] - self.boxes[track_index]) / elapsed
+            alpha = self.velocity_smoothing
+            self.velocities[track_index] = alpha * measured + (1 - alpha) * self.velocities[track_index]
+            self.boxes[track_index] = det_boxes[det_index]
+            self.updated_at[track_index] = frame_index
+            self.misses[track_index] = 0
+            self.detections.confidences[track_index] = detections.confidences[det_index]
+            self.detections.categories[track_index] = detections.categories[det_index]
+
+        # Несопоставленные треки активных моделей копят пропуски и удаляются
+        unmatched = np.setdiff1d(active_index, track_index)
+        self.misses[unmatched] += 1
+        keep = self.misses <= self.max_misses
+
+        # Новые треки для несопоставленных детекций
+        new_index = np.setdiff1d(np.arange(len(detections)), det_index)
+        new_ids = np.arange(self.next_id, self.next_id + len(new_index), dtype=np.int32)
+        self.next_id += len(new_index)
+        new_detections = detections.select(new_index)
+        new_detections.track_ids = new_ids
+
+        self.boxes = np.concatenate([self.boxes[keep], det_boxes[new_index]])
+        self.velocities = np.concatenate([self.velocities[keep], np.zeros((len(new_index), 4), dtype=np.float32)])
+        self.updated_at = np.concatenate([self.updated_at[keep], np.full(len(new_index), frame_index)])
+        self.misses = np.concatenate([self.misses[keep], np.zeros(len(new_index), dtype=np.int32)])
+        self.track_ids = np.concatenate([self.track_ids[keep], new_ids])
+        self.detections = DetectionBatch.concat([self.detections.select(keep), new_detections])
+        self.detections.track_ids = self.track_ids
+
+    def predict(self, frame_index):
+        # Показываются только треки, подтвержденные последним запуском своей модели
+        visible = self.misses == 0
+        elapsed = np.clip(frame_index - self.updated_at[visible], 0, self.max_predict_frames)[:, None]
+        boxes = self.boxes[visible] + self.velocities[visible] * elapsed
+
+        tracked = self.detections.select(visible)
+        tracked.bboxes = np.rint(boxes).astype(np.int32)
+        return tracked
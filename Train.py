@@ -1,10 +1,8 @@
 from ultralytics import YOLO
 import torch
 
-model = YOLO('yolov8n-obb.pt')
-
 # ОПТИМАЛЬНЫЕ ПАРАМЕТРЫ ДЛЯ МАКСИМАЛЬНОЙ СКОРОСТИ:
-results = model.train(
+TRAIN_PARAMS = dict(
     data="DOTAv1.yaml",
     epochs=30,
     imgsz=400,  # Увеличиваем до 640 (быстрее конвергенция)
@@ -52,4 +50,14 @@ results = model.train(
     max_det=300,
     fraction=1.0,
     single_cls=False,
-)
\ No newline at end of file
+)
+
+
+def train(model_path='yolov8n-obb.pt', **overrides):
+    # Параметры по умолчанию из TRAIN_PARAMS, overrides - для других запусков (например, Fuse.py)
+    model = YOLO(model_path)
+    return model.train(**{**TRAIN_PARAMS, **overrides})
+
+
+if __name__ == '__main__':
+    results = train()
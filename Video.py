@@ -0,0 +1,35 @@
+import os
+
+
+class HeldFrameWriter:
+    """Обертка над cv2.VideoWriter, которая не кодирует повторно один и тот же буфер.
+
+    Если подряд приходит тот же объект кадра (например, закешированный кадр паузы),
+    кадр в видео не пишется, а длительность удержания записывается в файл меток
+    рядом с видео: номер кадра в видео и сколько раз он должен был повториться.
+    """
+
+    def __init__(self, writer, video_path):
+        self.writer = writer
+        self.marker_path = os.path.splitext(video_path)[0] + '_holds.csv'
+        self.last_frame = None
+        self.frame_index = -1
+        self.holds = {}
+
+    def write(self, frame):
+        if frame is self.last_frame:
+            self.holds[self.frame_index] = self.holds.get(self.frame_index, 0) + 1
+            return
+
+        self.writer.write(frame)
+        self.last_frame = frame
+        self.frame_index += 1
+
+    def release(self):
+        self.writer.release()
+        self.last_frame = None
+
+        with open(self.marker_path, 'w', encoding='utf-8') as f:
+            f.write("frame,hold_frames\n")
+            for frame_index, hold_frames in self.holds.items():
+                f.write(f"{frame_index},{hold_frames}\n")